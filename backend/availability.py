@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .timestamps import from_epoch
+
+GRANULARITIES: Tuple[str, ...] = ("hour", "day", "month")
+UNKNOWN_PROTOCOL = "unknown"
+
+# (granularity, bucket_start, protocol, downtime, planned_downtime, outages, planned_outages)
+Contribution = Tuple[str, str, str, int, int, int, int]
+
+_UPSERT_CONTRIBUTION = """
+    INSERT INTO availability_rollups (
+        router_id, granularity, bucket_start, protocol,
+        downtime_seconds, planned_downtime_seconds, outage_count, planned_outage_count
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (router_id, granularity, bucket_start, protocol) DO UPDATE SET
+        downtime_seconds = downtime_seconds + excluded.downtime_seconds,
+        planned_downtime_seconds = planned_downtime_seconds + excluded.planned_downtime_seconds,
+        outage_count = outage_count + excluded.outage_count,
+        planned_outage_count = planned_outage_count + excluded.planned_outage_count
+"""
+
+
+def is_planned(status: Optional[str]) -> bool:
+    return bool(status) and status.startswith("planned")  # type: ignore[union-attr]
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Start of the bucket holding the naive router wall-clock time ``moment``."""
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "month":
+        return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"unknown granularity: {granularity}")
+
+
+def next_bucket(start: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return start + timedelta(hours=1)
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "month":
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+    raise ValueError(f"unknown granularity: {granularity}")
+
+
+def outage_contributions(
+    start_time: datetime,
+    end_time: datetime,
+    status: Optional[str],
+    protocol: Optional[str],
+    granularities: Tuple[str, ...] = GRANULARITIES,
+) -> Iterator[Contribution]:
+    """Split one outage into per-bucket downtime; it counts once, in its first bucket.
+
+    Buckets are router wall-clock periods. The outage is placed on the clock
+    of its start offset, the offset stored with the row, so no time zone is
+    needed.
+    """
+    clock = timezone(start_time.utcoffset())  # type: ignore[arg-type]
+    start = start_time.astimezone(clock).replace(tzinfo=None)
+    end = end_time.astimezone(clock).replace(tzinfo=None)
+    planned = is_planned(status)
+    protocol = protocol or UNKNOWN_PROTOCOL
+    for granularity in granularities:
+        current = bucket_start(start, granularity)
+        first = True
+        while first or current < end:
+            following = next_bucket(current, granularity)
+            overlap = int((min(end, following) - max(start, current)).total_seconds())
+            downtime = max(0, overlap)
+            count = 1 if first else 0
+            yield (
+                granularity,
+                current.isoformat(),
+                protocol,
+                downtime,
+                downtime if planned else 0,
+                count,
+                count if planned else 0,
+            )
+            first = False
+            current = following
+
+
+def apply_outage(
+    conn: sqlite3.Connection,
+    router_id: str,
+    start_time: datetime,
+    end_time: Optional[datetime],
+    status: Optional[str],
+    protocol: Optional[str],
+    sign: int = 1,
+) -> None:
+    """Add (``sign=1``) or remove (``sign=-1``) a closed outage from the rollups.
+
+    Open outages are not stored; their downtime keeps growing and is added at
+    query time instead.
+    """
+    if end_time is None:
+        return
+    _upsert_contributions(
+        conn,
+        router_id,
+        (
+            (granularity, bucket, proto, sign * down, sign * planned_down, sign * count, sign * planned_count)
+            for granularity, bucket, proto, down, planned_down, count, planned_count in outage_contributions(
+                start_time, end_time, status, protocol
+            )
+        ),
+    )
+
+
+def rebuild_rollups(conn: sqlite3.Connection, router_id: Optional[str] = None) -> None:
+    """Recompute the rollups of ``router_id`` (default: all routers) from the closed outages stored."""
+    totals: Dict[Tuple[str, str, str, str], List[int]] = {}
+    query = (
+        "SELECT router_id, start_time, end_time, tz_offset, status, protocol FROM outages"
+        " WHERE end_time IS NOT NULL"
+    )
+    params: Tuple[str, ...] = ()
+    if router_id is not None:
+        query += " AND router_id = ?"
+        params = (router_id,)
+    for row_router_id, start_value, end_value, tz_offset, status, protocol in conn.execute(query, params):
+        start_time = from_epoch(start_value, tz_offset)
+        end_time = from_epoch(end_value, tz_offset)
+        for granularity, bucket, proto, *values in outage_contributions(start_time, end_time, status, protocol):
+            sums = totals.setdefault((row_router_id, granularity, bucket, proto), [0, 0, 0, 0])
+            for index, value in enumerate(values):
+                sums[index] += value
+
+    if router_id is None:
+        conn.execute("DELETE FROM availability_rollups")
+    else:
+        conn.execute("DELETE FROM availability_rollups WHERE router_id = ?", (router_id,))
+    conn.executemany(_UPSERT_CONTRIBUTION, ((*key, *sums) for key, sums in totals.items()))
+
+
+def _upsert_contributions(conn: sqlite3.Connection, router_id: str, contributions: Iterable[Contribution]) -> None:
+    conn.executemany(_UPSERT_CONTRIBUTION, ((router_id, *contribution) for contribution in contributions))
+
@@ -3,10 +3,13 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import json
 import os
 
 from dotenv import load_dotenv
 
+from .models import DEFAULT_ROUTER_ID, DEFAULT_ROUTER_TIMEZONE
 from .outage_config import DEFAULT_OUTAGE_KEYWORDS
 
 def _parse_csv_env(name: str, fallback: tuple[str, ...]) -> tuple[str, ...]:
@@ -27,11 +30,27 @@ class Settings:
     fritzbox_address: str = os.getenv("FRITZBOX_ADDRESS", "fritz.box")
     fritzbox_username: Optional[str] = os.getenv("FRITZBOX_USERNAME")
     fritzbox_password: Optional[str] = os.getenv("FRITZBOX_PASSWORD")
+    fritzbox_cache_directory: Optional[Path] = (
+        Path(os.environ["FRITZBOX_CACHE_DIRECTORY"]) if os.getenv("FRITZBOX_CACHE_DIRECTORY") else None
+    )
     database_path: Path = Path(os.getenv("DATABASE_PATH", "data/stoergeler.db"))
+    routers_file: Optional[Path] = Path(os.environ["ROUTERS_FILE"]) if os.getenv("ROUTERS_FILE") else None
+    router_timezone: str = os.getenv("ROUTER_TIMEZONE", DEFAULT_ROUTER_TIMEZONE)
+    router_poll_concurrency: int = int(os.getenv("ROUTER_POLL_CONCURRENCY", "8"))
+    scheduler_jitter_seconds: float = float(os.getenv("SCHEDULER_JITTER_SECONDS", "2"))
+    job_timeout_seconds: float = float(os.getenv("JOB_TIMEOUT_SECONDS", "120"))
+    job_max_backoff_seconds: float = float(os.getenv("JOB_MAX_BACKOFF_SECONDS", "900"))
     poll_interval_seconds: int = int(os.getenv("POLL_INTERVAL_SECONDS", "60"))
     device_log_poll_interval_seconds: int = int(
         os.getenv("DEVICE_LOG_POLL_INTERVAL_SECONDS", "60")
     )
+    fast_poll_interval_seconds: float = float(os.getenv("FAST_POLL_INTERVAL_SECONDS", "10"))
+    stable_period_seconds: float = float(os.getenv("STABLE_PERIOD_SECONDS", "300"))
+    status_max_age_seconds: float = float(os.getenv("STATUS_MAX_AGE_SECONDS", "5"))
+    retention_device_log_days: int = int(os.getenv("RETENTION_DEVICE_LOG_DAYS", "0"))
+    retention_status_events_days: int = int(os.getenv("RETENTION_STATUS_EVENTS_DAYS", "0"))
+    retention_interval_seconds: int = int(os.getenv("RETENTION_INTERVAL_SECONDS", "86400"))
+    archive_directory: Path = Path(os.getenv("ARCHIVE_DIRECTORY", "data/archive"))
     outage_planned_keywords: tuple[str, ...] = _parse_csv_env(
         "OUTAGE_PLANNED_KEYWORDS", DEFAULT_OUTAGE_KEYWORDS.planned_keywords
     )
@@ -49,4 +68,63 @@ class Settings:
     )
 
 
+@dataclass(frozen=True)
+class RouterConfig:
+    """One monitored Fritzbox."""
+
+    router_id: str
+    address: str
+    username: Optional[str] = None
+    password: Optional[str] = None
+    name: Optional[str] = None
+    # IANA time zone of the router clock, used to read its log times
+    timezone: str = DEFAULT_ROUTER_TIMEZONE
+
+    @property
+    def zone(self) -> ZoneInfo:
+        return ZoneInfo(self.timezone)
+
+
+def load_routers(current: Settings) -> tuple[RouterConfig, ...]:
+    """Return the routers listed in ``ROUTERS_FILE``, or the single FRITZBOX_* router.
+
+    The file holds a JSON list of objects with ``id``, ``address`` and the
+    optional ``username``, ``password``, ``name`` and ``timezone`` (default:
+    ``ROUTER_TIMEZONE``).
+    """
+    if current.routers_file is None:
+        routers: tuple[RouterConfig, ...] = (
+            RouterConfig(
+                router_id=DEFAULT_ROUTER_ID,
+                address=current.fritzbox_address,
+                username=current.fritzbox_username,
+                password=current.fritzbox_password,
+                timezone=current.router_timezone,
+            ),
+        )
+    else:
+        routers = tuple(
+            RouterConfig(
+                router_id=str(item["id"]),
+                address=item["address"],
+                username=item.get("username"),
+                password=item.get("password"),
+                name=item.get("name"),
+                timezone=item.get("timezone", current.router_timezone),
+            )
+            for item in json.loads(current.routers_file.read_text(encoding="utf-8"))
+        )
+        if not routers:
+            raise ValueError(f"{current.routers_file}: no routers configured")
+        router_ids = [router.router_id for router in routers]
+        if len(set(router_ids)) != len(router_ids):
+            raise ValueError(f"{current.routers_file}: router ids must be unique")
+    for router in routers:
+        try:
+            ZoneInfo(router.timezone)
+        except (ZoneInfoNotFoundError, ValueError) as exc:
+            raise ValueError(f"router {router.router_id}: unknown time zone {router.timezone!r}") from exc
+    return routers
+
+
 settings = Settings()
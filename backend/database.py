@@ -1,105 +1,199 @@
 from __future__ import annotations
 
+import json
 import sqlite3
+import threading
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timedelta, timezone, tzinfo
 from pathlib import Path
-from typing import Any, Generator, Iterable, List, Optional, Sequence
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
 
-from .models import DeviceLogEntryRecord, OutageRecord, StatusEvent
+from . import availability
+from .metrics import DB_QUERY_SECONDS, timed_methods
+from .migrations import apply_migrations
+from .models import (
+    DEFAULT_ROUTER_ID,
+    DEFAULT_ROUTER_TIMEZONE,
+    AvailabilityBucketRecord,
+    DeviceLogBoundary,
+    DeviceLogEntryRecord,
+    OutageCheckpoint,
+    OutageRecord,
+    StatusEvent,
+)
+from .timestamps import epoch_ceil, epoch_floor, from_epoch, localize, to_epoch, to_wall_clock, utc_now_epoch
+
+
+# Keyset pagination position: the stored epoch timestamp and the row id.
+Cursor = Tuple[int, int]
+# Row id, stored epoch timestamp and the row already rendered as a JSON object.
+JsonRow = Tuple[int, int, str]
+
+# The router logs lines as "<dd.mm.yy HH:MM:SS> <message>" in its wall-clock
+# time. Such raw lines are stored as NULL and rebuilt from log_timestamp plus
+# tz_offset and message (SQLite's strftime has no %y, hence the substr).
+_RAW_TIMESTAMP_FORMAT = "%d.%m.%y %H:%M:%S"
+_DERIVED_RAW_SQL = (
+    "strftime('%d.%m.', log_timestamp + tz_offset, 'unixepoch')"
+    " || substr(strftime('%Y', log_timestamp + tz_offset, 'unixepoch'), 3)"
+    " || strftime(' %H:%M:%S ', log_timestamp + tz_offset, 'unixepoch') || message"
+)
+# Time zone of a router constructed without one.
+_DEFAULT_ZONE = ZoneInfo(DEFAULT_ROUTER_TIMEZONE)
 
 
 class DatabaseContext:
-    """Encapsulates the SQLite connection handling and schema initialisation."""
+    """Encapsulates the SQLite connection handling and schema initialisation.
+
+    Every thread keeps one long-lived connection in WAL mode, so readers in the
+    API threadpool never wait for a background sync write and repeated queries
+    hit the connection's prepared statement cache.
+    """
+
+    _PRAGMAS = (
+        # Only takes effect for new databases; RetentionRepository converts
+        # existing ones once.
+        "PRAGMA auto_vacuum = INCREMENTAL",
+        "PRAGMA journal_mode = WAL",
+        # Truncate the WAL file after checkpoints instead of keeping it at
+        # its largest size, e.g. after a VACUUM rewrote the whole database.
+        "PRAGMA journal_size_limit = 8388608",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -8000",
+        "PRAGMA mmap_size = 67108864",
+        "PRAGMA temp_store = MEMORY",
+    )
+    _BUSY_TIMEOUT_SECONDS = 5.0
+    _CACHED_STATEMENTS = 256
 
     def __init__(self, database_path: Path) -> None:
         self._database_path = database_path
         self._database_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._data_version = 0
+        self._data_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self._data_version_lock = threading.Lock()
 
     @contextmanager
     def connect(self) -> Generator[sqlite3.Connection, None, None]:
-        conn = sqlite3.connect(self._database_path)
-        conn.row_factory = sqlite3.Row
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = self._open()
+            self._local.connection = conn
+            self._local.depth = 0
+
+        self._local.depth += 1
         try:
             yield conn
         finally:
+            self._local.depth -= 1
+            # Never hand a half-finished transaction to the next caller on this thread.
+            if self._local.depth == 0 and conn.in_transaction:
+                conn.rollback()
+
+    @property
+    def data_version(self) -> Tuple[int, datetime]:
+        """In-process change counter and the (UTC, whole second) time of the last change."""
+        with self._data_version_lock:
+            return self._data_version, self._data_modified
+
+    def mark_changed(self) -> None:
+        """Record a committed change; repositories call this after every write."""
+        with self._data_version_lock:
+            self._data_version += 1
+            # Last-Modified has second resolution; keep it strictly increasing
+            # so If-Modified-Since never matches data changed within a second.
+            self._data_modified = max(
+                datetime.now(timezone.utc).replace(microsecond=0),
+                self._data_modified + timedelta(seconds=1),
+            )
+
+    def close(self) -> None:
+        """Close all pooled connections; threads reconnect lazily afterwards."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
             conn.close()
+        self._local = threading.local()
 
-    def init_schema(self) -> None:
+    @contextmanager
+    def connect_standalone(self) -> Generator[sqlite3.Connection, None, None]:
+        """Open a dedicated, unpooled connection.
+
+        Meant for long-running reads such as streamed exports, which may be
+        resumed from different threadpool threads and must not share the
+        per-thread connection.
+        """
+        conn = self._create_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = self._create_connection()
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _create_connection(self) -> sqlite3.Connection:
+        # Pooled connections are confined to their thread by ``self._local``;
+        # disabling the same-thread check only allows ``close`` to run from
+        # another thread (and standalone connections to move between threads).
+        conn = sqlite3.connect(
+            self._database_path,
+            timeout=self._BUSY_TIMEOUT_SECONDS,
+            check_same_thread=False,
+            cached_statements=self._CACHED_STATEMENTS,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self._PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def init_schema(self, zone: tzinfo = _DEFAULT_ZONE) -> None:
+        """Apply pending migrations; ``zone`` is the time zone of the router ``default``."""
         with self.connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS status_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    details TEXT
-                )
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS device_log_entries (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    log_timestamp TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    raw TEXT,
-                    source TEXT DEFAULT 'tr064',
-                    ingested_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE (log_timestamp, message)
-                )
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS outages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    start_time TEXT NOT NULL,
-                    end_time TEXT,
-                    duration_seconds INTEGER,
-                    status TEXT NOT NULL,
-                    source TEXT NOT NULL DEFAULT 'calculated',
-                    start_log_entry_id INTEGER,
-                    end_log_entry_id INTEGER,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    FOREIGN KEY (start_log_entry_id) REFERENCES device_log_entries(id) ON DELETE SET NULL,
-                    FOREIGN KEY (end_log_entry_id) REFERENCES device_log_entries(id) ON DELETE SET NULL
-                )
-                """
-            )
-            # Migration: add source column to existing databases
-            try:
-                conn.execute("ALTER TABLE outages ADD COLUMN source TEXT NOT NULL DEFAULT 'calculated'")
-            except sqlite3.OperationalError:
-                pass  # Column already exists
-            conn.commit()
+            apply_migrations(conn, zone)
 
 
+@timed_methods(DB_QUERY_SECONDS)
 class StatusRepository:
-    """Access to connection status change events."""
+    """Access to the connection status change events of one router."""
 
-    def __init__(self, context: DatabaseContext) -> None:
+    def __init__(
+        self, context: DatabaseContext, router_id: str = DEFAULT_ROUTER_ID, zone: tzinfo = _DEFAULT_ZONE
+    ) -> None:
         self._context = context
+        self._router_id = router_id
+        # Naive times, e.g. router log times and API bounds, are local time of this zone.
+        self._zone = zone
 
     def record_event(self, status: str, timestamp: datetime, details: Optional[str] = None) -> None:
         with self._context.connect() as conn:
             conn.execute(
-                "INSERT INTO status_events (timestamp, status, details) VALUES (?, ?, ?)",
-                (timestamp.isoformat(), status, details),
+                "INSERT INTO status_events (router_id, timestamp, tz_offset, status, details)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self._router_id, *to_epoch(localize(timestamp, self._zone)), status, details),
             )
             conn.commit()
+        self._context.mark_changed()
 
     def latest_event(self) -> Optional[StatusEvent]:
         with self._context.connect() as conn:
             row = conn.execute(
-                "SELECT id, timestamp, status, details FROM status_events ORDER BY timestamp DESC LIMIT 1"
+                "SELECT id, timestamp, tz_offset, status, details FROM status_events"
+                " WHERE router_id = ? ORDER BY timestamp DESC, id DESC LIMIT 1",
+                (self._router_id,),
             ).fetchone()
         if row is None:
             return None
         return StatusEvent(
             id=row["id"],
-            timestamp=datetime.fromisoformat(row["timestamp"]),
+            timestamp=from_epoch(row["timestamp"], row["tz_offset"]),
             status=row["status"],
             details=row["details"],
         )
@@ -109,163 +203,439 @@ class StatusRepository:
         start: Optional[datetime] = None,
         end: Optional[datetime] = None,
     ) -> Iterable[StatusEvent]:
-        query = "SELECT id, timestamp, status, details FROM status_events WHERE 1=1"
-        params: list[str] = []
+        query = "SELECT id, timestamp, tz_offset, status, details FROM status_events WHERE router_id = ?"
+        params: list[Any] = [self._router_id]
         if start is not None:
             query += " AND timestamp >= ?"
-            params.append(start.isoformat())
+            params.append(epoch_ceil(localize(start, self._zone)))
         if end is not None:
             query += " AND timestamp <= ?"
-            params.append(end.isoformat())
-        query += " ORDER BY timestamp ASC"
+            params.append(epoch_floor(localize(end, self._zone)))
+        query += " ORDER BY timestamp ASC, id ASC"
 
         with self._context.connect() as conn:
             for row in conn.execute(query, params):
                 yield StatusEvent(
                     id=row["id"],
-                    timestamp=datetime.fromisoformat(row["timestamp"]),
+                    timestamp=from_epoch(row["timestamp"], row["tz_offset"]),
                     status=row["status"],
                     details=row["details"],
                 )
 
 
+@timed_methods(DB_QUERY_SECONDS)
 class DeviceLogRepository:
-    """Persists raw device log entries sourced from the Fritzbox."""
+    """Persists the raw device log entries of one Fritzbox."""
 
-    def __init__(self, context: DatabaseContext) -> None:
+    def __init__(
+        self, context: DatabaseContext, router_id: str = DEFAULT_ROUTER_ID, zone: tzinfo = _DEFAULT_ZONE
+    ) -> None:
         self._context = context
+        self._router_id = router_id
+        # Naive times, e.g. router log times and API bounds, are local time of this zone.
+        self._zone = zone
 
     def ingest_entries(self, entries: Iterable[dict[str, Any]]) -> int:
-        rows: list[tuple[str, str, Optional[str], str]] = []
+        return len(self.ingest_new_entries(entries))
+
+    def ingest_new_entries(self, entries: Iterable[dict[str, Any]]) -> List[int]:
+        """Insert entries in one transaction and return the ids of rows that were new."""
+        rows: list[tuple[str, int, int, str, Optional[str], str]] = []
         for entry in entries:
             timestamp = entry.get("timestamp")
             message = entry.get("message")
             if not timestamp or not message:
                 continue
-            rows.append((timestamp, message, entry.get("raw"), entry.get("source", "tr064")))
+            try:
+                moment = datetime.fromisoformat(timestamp)
+            except ValueError:
+                continue
+            epoch, tz_offset = to_epoch(localize(moment, self._zone))
+            raw = entry.get("raw") or ""
+            # Compare against the round-tripped time: wall times inside a DST
+            # gap read back an hour off and keep their raw line.
+            if raw == f"{from_epoch(epoch, tz_offset).strftime(_RAW_TIMESTAMP_FORMAT)} {message}":
+                raw = None
+            rows.append((self._router_id, epoch, tz_offset, message, raw, entry.get("source", "tr064")))
 
         if not rows:
-            return 0
+            return []
 
-        inserted = 0
         with self._context.connect() as conn:
-            for timestamp, message, raw, source in rows:
-                cursor = conn.execute(
-                    """
-                    INSERT OR IGNORE INTO device_log_entries (log_timestamp, message, raw, source)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (timestamp, message, raw, source),
+            # The write lock is held from BEGIN IMMEDIATE on, so every row with
+            # an id above the previous maximum was inserted by this call.
+            conn.execute("BEGIN IMMEDIATE")
+            (previous_max_id,) = conn.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM device_log_entries"
+            ).fetchone()
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO device_log_entries (router_id, log_timestamp, tz_offset, message, raw, source)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            new_ids = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT id FROM device_log_entries WHERE id > ? ORDER BY id", (previous_max_id,)
                 )
-                inserted += cursor.rowcount
+            ]
             conn.commit()
-        return inserted
+        if new_ids:
+            self._context.mark_changed()
+        return new_ids
+
+    def latest_boundary(self) -> Optional[DeviceLogBoundary]:
+        """Return the newest stored log second, as router wall-clock time, with all messages logged at it."""
+        with self._context.connect() as conn:
+            latest = conn.execute(
+                "SELECT log_timestamp, tz_offset FROM device_log_entries"
+                " WHERE router_id = ? ORDER BY log_timestamp DESC LIMIT 1",
+                (self._router_id,),
+            ).fetchone()
+            if latest is None:
+                return None
+            messages = frozenset(
+                row[0]
+                for row in conn.execute(
+                    "SELECT message FROM device_log_entries WHERE router_id = ? AND log_timestamp = ?",
+                    (self._router_id, latest[0]),
+                )
+            )
+        return DeviceLogBoundary(timestamp=from_epoch(latest[0], latest[1]).replace(tzinfo=None), messages=messages)
+
+    def latest_entry_id(self) -> Optional[int]:
+        """Return the highest stored entry id of this router, if any."""
+        with self._context.connect() as conn:
+            row = conn.execute(
+                "SELECT MAX(id) FROM device_log_entries WHERE router_id = ?", (self._router_id,)
+            ).fetchone()
+        return row[0]
 
     def list_entries(
         self,
         *,
         limit: Optional[int] = None,
         ascending: bool = True,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
     ) -> List[DeviceLogEntryRecord]:
-        order_clause = "ASC" if ascending else "DESC"
-        query = (
-            "SELECT id, log_timestamp, message, raw, source"
-            " FROM device_log_entries"
-            f" ORDER BY log_timestamp {order_clause}"
+        query, params, reverse = _build_range_query(
+            "SELECT id, log_timestamp, tz_offset, message, raw, source FROM device_log_entries",
+            "log_timestamp",
+            conditions=["router_id = ?"],
+            params=[self._router_id],
+            zone=self._zone,
+            start=start,
+            end=end,
+            before=before,
+            after=after,
+            ascending=ascending,
+            limit=limit,
         )
-        params: Sequence[Any] = ()
-        if limit is not None:
-            query += " LIMIT ?"
-            params = (limit,)
 
         with self._context.connect() as conn:
             rows = conn.execute(query, params).fetchall()
+        if reverse:
+            rows.reverse()
+        return [_entry_record(row) for row in rows]
 
-        records: List[DeviceLogEntryRecord] = []
-        for row in rows:
-            try:
-                timestamp = datetime.fromisoformat(row["log_timestamp"])
-            except ValueError:
-                continue
-            records.append(
-                DeviceLogEntryRecord(
-                    id=row["id"],
-                    timestamp=timestamp,
-                    message=row["message"],
-                    raw=row["raw"],
-                    source=row["source"],
-                )
-            )
-        return records
+    def list_entries_after(self, entry_id: int) -> List[DeviceLogEntryRecord]:
+        """Entries of this router with an id above ``entry_id``, oldest first.
 
+        Reads the id range from ``idx_device_log_entries_router_id``, so the
+        cost depends on the number of new rows of this router rather than on
+        the size of the log.
+        """
+        with self._context.connect() as conn:
+            # Ordering by time in SQL would walk the time index over the
+            # whole log instead; only the new rows are sorted here.
+            rows = conn.execute(
+                "SELECT id, log_timestamp, tz_offset, message, raw, source"
+                " FROM device_log_entries WHERE router_id = ? AND id > ? ORDER BY id",
+                (self._router_id, entry_id),
+            ).fetchall()
+        rows.sort(key=lambda row: (row["log_timestamp"], row["id"]))
+        return [_entry_record(row) for row in rows]
 
+    def list_entries_json(
+        self,
+        *,
+        limit: Optional[int] = None,
+        ascending: bool = True,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[JsonRow]:
+        """Like ``list_entries``, but SQLite renders each row as a ``DeviceLogEntry`` JSON object."""
+        query, params, reverse = _build_range_query(
+            f"""
+            SELECT id, log_timestamp, json_object(
+                'timestamp', {_json_time_sql('log_timestamp')},
+                'message', message,
+                'raw', CASE WHEN raw IS NULL THEN {_DERIVED_RAW_SQL} WHEN raw = '' THEN message ELSE raw END
+            ) FROM device_log_entries
+            """,
+            "log_timestamp",
+            conditions=["router_id = ?"],
+            params=[self._router_id],
+            zone=self._zone,
+            start=start,
+            end=end,
+            before=before,
+            after=after,
+            ascending=ascending,
+            limit=limit,
+        )
+        return _fetch_json_rows(self._context, query, params, reverse)
+
+    def iter_entries(self) -> Iterator[DeviceLogEntryRecord]:
+        """Yield entries oldest first as they are read, without building a list.
+
+        Reads from this thread's pooled connection; exhaust the iterator
+        before writing on the same thread.
+        """
+        query, params, _ = _build_range_query(
+            "SELECT id, log_timestamp, tz_offset, message, raw, source FROM device_log_entries",
+            "log_timestamp",
+            conditions=["router_id = ?"],
+            params=[self._router_id],
+        )
+        with self._context.connect() as conn:
+            for row in conn.execute(query, params):
+                yield _entry_record(row)
+
+
+@timed_methods(DB_QUERY_SECONDS)
 class OutageRepository:
-    """Stores calculated outage intervals for quick retrieval."""
+    """Stores the calculated outage intervals of one router for quick retrieval."""
 
-    def __init__(self, context: DatabaseContext) -> None:
+    def __init__(
+        self, context: DatabaseContext, router_id: str = DEFAULT_ROUTER_ID, zone: tzinfo = _DEFAULT_ZONE
+    ) -> None:
         self._context = context
+        self._router_id = router_id
+        # Naive times, e.g. router log times and API bounds, are local time of this zone.
+        self._zone = zone
+
+    _INSERT_CALCULATED = """
+        INSERT INTO outages (
+            router_id,
+            start_time,
+            end_time,
+            duration_seconds,
+            status,
+            start_log_entry_id,
+            end_log_entry_id,
+            protocol,
+            tz_offset,
+            created_at,
+            updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    def replace_outages(
+        self,
+        outages: Iterable[dict[str, Any]],
+        checkpoint: Optional[OutageCheckpoint] = None,
+    ) -> None:
+        timestamp = utc_now_epoch()
+        with self._context.connect() as conn:
+            # Outages starting before the oldest remaining log entry were
+            # derived from archived entries and are kept as they are.
+            conn.execute(
+                "DELETE FROM outages WHERE router_id = ? AND source = 'calculated' AND start_time >="
+                " (SELECT COALESCE(MIN(log_timestamp), 0) FROM device_log_entries WHERE router_id = ?)",
+                (self._router_id, self._router_id),
+            )
+            conn.executemany(
+                self._INSERT_CALCULATED,
+                ((self._router_id, *_outage_values(outage), timestamp, timestamp) for outage in outages),
+            )
+            availability.rebuild_rollups(conn, self._router_id)
+            if checkpoint is not None:
+                _store_checkpoint(conn, self._router_id, checkpoint, timestamp)
+            conn.commit()
+        self._context.mark_changed()
 
-    def replace_outages(self, outages: Iterable[dict[str, Any]]) -> None:
-        timestamp = datetime.utcnow().isoformat()
+    def upsert_outages(
+        self,
+        outages: Iterable[dict[str, Any]],
+        checkpoint: OutageCheckpoint,
+    ) -> None:
+        """Insert or update calculated outages keyed by their start log entry."""
+        timestamp = utc_now_epoch()
+        changed = False
         with self._context.connect() as conn:
-            conn.execute("DELETE FROM outages WHERE source = 'calculated'")
+            conn.execute("BEGIN IMMEDIATE")
             for outage in outages:
-                conn.execute(
-                    """
-                    INSERT INTO outages (
-                        start_time,
-                        end_time,
-                        duration_seconds,
-                        status,
-                        start_log_entry_id,
-                        end_log_entry_id,
-                        created_at,
-                        updated_at
+                changed = True
+                values = _outage_values(outage)
+                previous = conn.execute(
+                    "SELECT id, start_time, end_time, tz_offset, status, protocol FROM outages"
+                    " WHERE router_id = ? AND source = 'calculated' AND start_log_entry_id = ?",
+                    (self._router_id, values[4]),
+                ).fetchone()
+                if previous is None:
+                    conn.execute(self._INSERT_CALCULATED, (self._router_id, *values, timestamp, timestamp))
+                else:
+                    if previous["end_time"] is not None:
+                        availability.apply_outage(
+                            conn,
+                            self._router_id,
+                            from_epoch(previous["start_time"], previous["tz_offset"]),
+                            from_epoch(previous["end_time"], previous["tz_offset"]),
+                            previous["status"],
+                            previous["protocol"],
+                            sign=-1,
+                        )
+                    conn.execute(
+                        """
+                        UPDATE outages
+                        SET start_time = ?, end_time = ?, duration_seconds = ?, status = ?,
+                            end_log_entry_id = ?, protocol = ?, tz_offset = ?, updated_at = ?
+                        WHERE id = ?
+                        """,
+                        (*values[:4], *values[5:], timestamp, previous["id"]),
                     )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        outage["start_time"].isoformat(),
-                        outage["end_time"].isoformat() if outage.get("end_time") else None,
-                        outage.get("duration_seconds"),
-                        outage.get("status", "closed"),
-                        outage.get("start_log_entry_id"),
-                        outage.get("end_log_entry_id"),
-                        timestamp,
-                        timestamp,
-                    ),
+                availability.apply_outage(
+                    conn,
+                    self._router_id,
+                    outage["start_time"],
+                    outage.get("end_time"),
+                    outage.get("status"),
+                    outage.get("protocol"),
                 )
+            _store_checkpoint(conn, self._router_id, checkpoint, timestamp)
             conn.commit()
+        if changed:
+            self._context.mark_changed()
+
+    def load_checkpoint(self) -> Optional[OutageCheckpoint]:
+        with self._context.connect() as conn:
+            row = conn.execute(
+                "SELECT last_entry_id, last_timestamp, open_state, pending_planned, config_fingerprint"
+                " FROM outage_calculator_state WHERE router_id = ?",
+                (self._router_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        open_state = {
+            protocol: {
+                "start": datetime.fromisoformat(state["start"]) if state["start"] else None,
+                "start_entry_id": state["start_entry_id"],
+                "planned": state["planned"],
+            }
+            for protocol, state in json.loads(row["open_state"]).items()
+        }
+        return OutageCheckpoint(
+            last_entry_id=row["last_entry_id"],
+            last_timestamp=(
+                datetime.fromisoformat(row["last_timestamp"]) if row["last_timestamp"] else None
+            ),
+            open_state=open_state,
+            pending_planned=json.loads(row["pending_planned"]),
+            config_fingerprint=row["config_fingerprint"],
+        )
+
+    def list_outages(
+        self,
+        *,
+        limit: Optional[int] = None,
+        ascending: bool = True,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[OutageRecord]:
+        query, params, reverse = _build_range_query(
+            "SELECT id, start_time, end_time, tz_offset, duration_seconds, status, protocol FROM outages",
+            "start_time",
+            conditions=["router_id = ?"],
+            params=[self._router_id],
+            zone=self._zone,
+            start=start,
+            end=end,
+            before=before,
+            after=after,
+            ascending=ascending,
+            limit=limit,
+        )
 
-    def list_outages(self) -> List[OutageRecord]:
         with self._context.connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        if reverse:
+            rows.reverse()
+
+        return _outage_records(rows)
+
+    def list_outages_json(
+        self,
+        *,
+        limit: Optional[int] = None,
+        ascending: bool = True,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[JsonRow]:
+        """Like ``list_outages``, but SQLite renders each row as an ``OutageWindow`` JSON object."""
+        query, params, reverse = _build_range_query(
+            f"""
+            SELECT id, start_time, json_object(
+                'start', {_json_time_sql('start_time')},
+                'end', {_json_time_sql('end_time')},
+                'duration_seconds', duration_seconds,
+                'status', status,
+                'protocol', protocol
+            ) FROM outages
+            """,
+            "start_time",
+            conditions=["router_id = ?"],
+            params=[self._router_id],
+            zone=self._zone,
+            start=start,
+            end=end,
+            before=before,
+            after=after,
+            ascending=ascending,
+            limit=limit,
+        )
+        return _fetch_json_rows(self._context, query, params, reverse)
+
+    def list_overlapping(self, start: datetime, end: datetime) -> List[OutageRecord]:
+        """Return outages overlapping ``[start, end)``, oldest first.
+
+        A closed outage overlapping the range cannot have started earlier than
+        ``start`` minus the longest stored span, which bounds the scan on
+        ``idx_outages_start_time``; ``idx_outages_span`` answers that maximum.
+        Open outages (``end_time IS NULL``) overlap every range after their
+        start and come from the partial ``idx_outages_open`` index.
+        """
+        start_epoch = epoch_floor(localize(start, self._zone))
+        end_epoch = epoch_ceil(localize(end, self._zone))
+        with self._context.connect() as conn:
+            (max_span,) = conn.execute(
+                "SELECT MAX(end_time - start_time) FROM outages WHERE router_id = ?", (self._router_id,)
+            ).fetchone()
+            lower = start_epoch - (max_span or 0)
             rows = conn.execute(
-                "SELECT start_time, end_time, duration_seconds, status FROM outages ORDER BY start_time ASC"
+                """
+                SELECT id, start_time, end_time, tz_offset, duration_seconds, status, protocol FROM outages
+                WHERE router_id = ? AND start_time >= ? AND start_time < ? AND (end_time IS NULL OR end_time > ?)
+                UNION ALL
+                SELECT id, start_time, end_time, tz_offset, duration_seconds, status, protocol FROM outages
+                WHERE router_id = ? AND end_time IS NULL AND start_time < ?
+                ORDER BY start_time, id
+                """,
+                (self._router_id, lower, end_epoch, start_epoch, self._router_id, min(lower, end_epoch)),
             ).fetchall()
-
-        records: List[OutageRecord] = []
-        for row in rows:
-            try:
-                start_dt = datetime.fromisoformat(row["start_time"])
-            except ValueError:
-                continue
-            end_value = row["end_time"]
-            if end_value:
-                try:
-                    end_dt = datetime.fromisoformat(end_value)
-                except ValueError:
-                    end_dt = None
-            else:
-                end_dt = None
-            records.append(
-                OutageRecord(
-                    start_time=start_dt,
-                    end_time=end_dt,
-                    duration_seconds=row["duration_seconds"],
-                    status=row["status"],
-                )
-            )
-        return records
+        return _outage_records(rows)
 
     def create_outage(
         self,
@@ -275,29 +645,430 @@ class OutageRepository:
         status: str = "manual",
     ) -> int:
         """Insert a single manually-created outage and return its row ID."""
+        start_time = localize(start_time, self._zone)
+        end_time = localize(end_time, self._zone) if end_time else None
         if end_time and duration_seconds is None:
             duration_seconds = max(1, int((end_time - start_time).total_seconds()))
 
-        now = datetime.utcnow().isoformat()
+        start_epoch, tz_offset = to_epoch(start_time)
+        now = utc_now_epoch()
         with self._context.connect() as conn:
             cursor = conn.execute(
                 """
                 INSERT INTO outages (
-                    start_time, end_time, duration_seconds,
+                    router_id, start_time, end_time, tz_offset, duration_seconds,
                     status, source,
                     start_log_entry_id, end_log_entry_id,
                     created_at, updated_at
                 )
-                VALUES (?, ?, ?, ?, 'manual', NULL, NULL, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, 'manual', NULL, NULL, ?, ?)
                 """,
                 (
-                    start_time.isoformat(),
-                    end_time.isoformat() if end_time else None,
+                    self._router_id,
+                    start_epoch,
+                    to_epoch(end_time)[0] if end_time else None,
+                    tz_offset,
                     duration_seconds,
                     status,
                     now,
                     now,
                 ),
             )
+            availability.apply_outage(conn, self._router_id, start_time, end_time, status, None)
+            conn.commit()
+        self._context.mark_changed()
+        return cursor.lastrowid  # type: ignore[return-value]
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class AvailabilityRepository:
+    """Reads the availability rollups of one router maintained by ``OutageRepository``."""
+
+    def __init__(
+        self, context: DatabaseContext, router_id: str = DEFAULT_ROUTER_ID, zone: tzinfo = _DEFAULT_ZONE
+    ) -> None:
+        self._context = context
+        self._router_id = router_id
+        # Naive times, e.g. router log times and API bounds, are local time of this zone.
+        self._zone = zone
+
+    def list_buckets(
+        self,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+    ) -> List[AvailabilityBucketRecord]:
+        """Return buckets with downtime between ``start`` and ``end``, per protocol.
+
+        Buckets are periods of the router's wall-clock time; naive ``start``
+        and ``end`` values are read as such. Buckets without any downtime are
+        omitted. Still-open outages count up to the current time.
+        """
+        first_bucket = availability.bucket_start(to_wall_clock(start, self._zone), granularity)
+        end_local = to_wall_clock(end, self._zone)
+        totals: Dict[Tuple[str, str], List[int]] = {}
+        with self._context.connect() as conn:
+            for row in conn.execute(
+                """
+                SELECT bucket_start, protocol, downtime_seconds, planned_downtime_seconds,
+                       outage_count, planned_outage_count
+                FROM availability_rollups
+                WHERE router_id = ? AND granularity = ? AND bucket_start >= ? AND bucket_start < ?
+                """,
+                (self._router_id, granularity, first_bucket.isoformat(), end_local.isoformat()),
+            ):
+                totals[(row[0], row[1])] = list(row[2:])
+            open_rows = conn.execute(
+                "SELECT start_time, tz_offset, status, protocol FROM outages"
+                " WHERE router_id = ? AND end_time IS NULL AND start_time < ?",
+                (self._router_id, epoch_ceil(localize(end, self._zone))),
+            ).fetchall()
+
+        now = datetime.now(timezone.utc)
+        for start_value, tz_offset, status, protocol in open_rows:
+            open_start = from_epoch(start_value, tz_offset)
+            # Like the rollups, the open outage is placed on the clock of its start offset.
+            open_end = min(now, end_local.replace(tzinfo=open_start.tzinfo))
+            contributions = availability.outage_contributions(
+                open_start, max(open_start, open_end), status, protocol, (granularity,)
+            )
+            for _, bucket, bucket_protocol, *values in contributions:
+                if not first_bucket.isoformat() <= bucket < end_local.isoformat():
+                    continue
+                sums = totals.setdefault((bucket, bucket_protocol), [0, 0, 0, 0])
+                for index, value in enumerate(values):
+                    sums[index] += value
+
+        records: List[AvailabilityBucketRecord] = []
+        for (bucket, protocol), (downtime, planned_downtime, count, planned_count) in sorted(totals.items()):
+            if not (downtime or count):
+                continue
+            bucket_start = datetime.fromisoformat(bucket)
+            records.append(
+                AvailabilityBucketRecord(
+                    # Localized, a bucket spanning a DST change is 23 or 25 hours long.
+                    bucket_start=localize(bucket_start, self._zone),
+                    bucket_end=localize(availability.next_bucket(bucket_start, granularity), self._zone),
+                    protocol=protocol,
+                    downtime_seconds=downtime,
+                    planned_downtime_seconds=planned_downtime,
+                    outage_count=count,
+                    planned_outage_count=planned_count,
+                )
+            )
+        return records
+
+
+class ExportRepository:
+    """Streams complete tables for bulk export."""
+
+    TABLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+        "status_events": ("id", "router_id", "timestamp", "status", "details"),
+        "device_log_entries": ("id", "router_id", "log_timestamp", "message", "raw", "source", "ingested_at"),
+        "outages": (
+            "id",
+            "router_id",
+            "start_time",
+            "end_time",
+            "duration_seconds",
+            "status",
+            "source",
+            "protocol",
+            "start_log_entry_id",
+            "end_log_entry_id",
+            "created_at",
+            "updated_at",
+        ),
+    }
+
+    def __init__(self, context: DatabaseContext, batch_size: int = 500) -> None:
+        self._context = context
+        self._batch_size = batch_size
+
+    def iter_rows(self, table: str, router_id: Optional[str] = None) -> Iterator[Tuple[Any, ...]]:
+        """Yield all rows of ``table`` (optionally of one router) in id order without loading them at once."""
+        query = f"SELECT {_export_select_list(table)} FROM {table}"
+        params: Tuple[str, ...] = ()
+        if router_id is not None:
+            query += " WHERE router_id = ?"
+            params = (router_id,)
+        with self._context.connect_standalone() as conn:
+            conn.row_factory = None
+            cursor = conn.execute(f"{query} ORDER BY id", params)
+            while True:
+                rows = cursor.fetchmany(self._batch_size)
+                if not rows:
+                    return
+                yield from _export_rows(table, rows)
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class RetentionRepository:
+    """Removes expired rows after archiving and reclaims the freed pages."""
+
+    TIME_COLUMNS: Dict[str, str] = {
+        "status_events": "timestamp",
+        "device_log_entries": "log_timestamp",
+    }
+
+    # Rows that always stay, per router: the newest status event (the
+    # tracker's last known state) and, for the log, everything from the newest
+    # second (the sync boundary), the oldest entry the calculator has not
+    # processed yet or the start of the oldest open outage on. Archived log
+    # entries are thus always all entries before one point in time.
+    _ARCHIVABLE: Dict[str, str] = {
+        "status_events": "id < (SELECT MAX(id) FROM status_events WHERE router_id = :router_id)",
+        "device_log_entries": (
+            "log_timestamp < (SELECT MAX(log_timestamp) FROM device_log_entries WHERE router_id = :router_id)"
+            " AND log_timestamp < (SELECT COALESCE(MIN(log_timestamp), 9223372036854775807)"
+            " FROM device_log_entries WHERE router_id = :router_id AND id > (SELECT COALESCE(last_entry_id, 0)"
+            " FROM outage_calculator_state WHERE router_id = :router_id))"
+            " AND log_timestamp < (SELECT COALESCE(MIN(start_time), 9223372036854775807) FROM outages"
+            " WHERE router_id = :router_id AND source = 'calculated' AND end_time IS NULL)"
+        ),
+    }
+
+    def __init__(self, context: DatabaseContext, batch_size: int = 5000) -> None:
+        self._context = context
+        self._batch_size = batch_size
+        # Raw lines up to this id were already compacted by this process.
+        self._compacted_through_id = 0
+
+    def router_ids(self, table: str) -> List[str]:
+        """Routers with rows in ``table``, including routers no longer configured."""
+        with self._context.connect() as conn:
+            return [row[0] for row in conn.execute(f"SELECT DISTINCT router_id FROM {table}")]
+
+    def expired_rows(self, table: str, router_id: str, cutoff: datetime, limit: int) -> List[Tuple[Any, ...]]:
+        """Return up to ``limit`` of the oldest archivable rows of ``router_id`` before ``cutoff``.
+
+        Rows use the export layout (``ExportRepository.TABLE_COLUMNS``).
+        """
+        time_column = self.TIME_COLUMNS[table]
+        with self._context.connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_export_select_list(table)} FROM {table}"
+                f" WHERE router_id = :router_id AND {time_column} < :cutoff AND {self._ARCHIVABLE[table]}"
+                f" ORDER BY {time_column}, id LIMIT :limit",
+                {"router_id": router_id, "cutoff": epoch_floor(cutoff), "limit": limit},
+            ).fetchall()
+        return list(_export_rows(table, rows))
+
+    def delete_rows(self, table: str, ids: Iterable[int]) -> None:
+        with self._context.connect() as conn:
+            conn.executemany(f"DELETE FROM {table} WHERE id = ?", ((row_id,) for row_id in ids))
             conn.commit()
-            return cursor.lastrowid  # type: ignore[return-value]
+        self._context.mark_changed()
+
+    def compact_raw_lines(self) -> int:
+        """Drop stored raw log lines that equal the line rebuilt from timestamp and message.
+
+        Works through the ids in batches, each in its own short transaction,
+        and skips the ids already handled by an earlier call.
+        """
+        compacted = 0
+        with self._context.connect() as conn:
+            (max_id,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM device_log_entries").fetchone()
+            while self._compacted_through_id < max_id:
+                batch_end = min(self._compacted_through_id + self._batch_size, max_id)
+                cursor = conn.execute(
+                    "UPDATE device_log_entries SET raw = NULL WHERE id > ? AND id <= ?"
+                    f" AND raw IS NOT NULL AND raw = {_DERIVED_RAW_SQL}",
+                    (self._compacted_through_id, batch_end),
+                )
+                conn.commit()
+                compacted += cursor.rowcount
+                self._compacted_through_id = batch_end
+        # Rebuilt lines are identical, so API responses and their ETags stay valid.
+        return compacted
+
+    def reclaim_space(self) -> None:
+        """Return free pages to the file system.
+
+        Databases created before incremental auto-vacuum was enabled need one
+        full VACUUM to switch modes; afterwards only free pages are released.
+        """
+        with self._context.connect() as conn:
+            (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+            if mode != 2:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+            else:
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+            # Shrink the WAL file the rewrites above have grown.
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+
+def _build_range_query(
+    select: str,
+    time_column: str,
+    *,
+    conditions: Optional[List[str]] = None,
+    params: Optional[List[Any]] = None,
+    zone: tzinfo = _DEFAULT_ZONE,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    before: Optional[Cursor] = None,
+    after: Optional[Cursor] = None,
+    ascending: bool = True,
+    limit: Optional[int] = None,
+) -> Tuple[str, List[Any], bool]:
+    """Build a time-range/keyset query ordered by ``(time_column, id)``.
+
+    ``before``/``after`` select rows strictly before/after a cursor. Rows are
+    always fetched starting next to the cursor, so a query that walks against
+    the requested order is scanned the other way round; the returned flag says
+    whether the caller has to reverse the fetched rows. Naive ``start``/``end``
+    values are local time of ``zone``.
+    """
+    where = list(conditions or [])
+    values = list(params or [])
+    if start is not None:
+        where.append(f"{time_column} >= ?")
+        values.append(epoch_ceil(localize(start, zone)))
+    if end is not None:
+        where.append(f"{time_column} <= ?")
+        values.append(epoch_floor(localize(end, zone)))
+    if before is not None:
+        where.append(f"({time_column}, id) < (?, ?)")
+        values.extend(before)
+    if after is not None:
+        where.append(f"({time_column}, id) > (?, ?)")
+        values.extend(after)
+
+    reverse = (ascending and before is not None) or (not ascending and after is not None)
+    scan_ascending = ascending != reverse
+    order = "ASC" if scan_ascending else "DESC"
+
+    query = select
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += f" ORDER BY {time_column} {order}, id {order}"
+    if limit is not None:
+        query += " LIMIT ?"
+        values.append(limit)
+    return query, values, reverse
+
+
+def _fetch_json_rows(context: DatabaseContext, query: str, params: List[Any], reverse: bool) -> List[JsonRow]:
+    with context.connect() as conn:
+        rows: List[JsonRow] = [tuple(row) for row in conn.execute(query, params)]  # type: ignore[misc]
+    if reverse:
+        rows.reverse()
+    return rows
+
+
+def _json_time_sql(column: str) -> str:
+    """SQL rendering an epoch column the way pydantic's JSON mode renders the decoded datetime."""
+    return (
+        f"CASE WHEN {column} IS NULL THEN NULL"
+        f" WHEN tz_offset = 0 THEN strftime('%Y-%m-%dT%H:%M:%SZ', {column}, 'unixepoch')"
+        f" ELSE strftime('%Y-%m-%dT%H:%M:%S', {column} + tz_offset, 'unixepoch')"
+        " || CASE WHEN tz_offset < 0 THEN '-' ELSE '+' END"
+        " || printf('%02d:%02d', abs(tz_offset) / 3600, abs(tz_offset) % 3600 / 60) END"
+    )
+
+
+def _entry_record(row: sqlite3.Row) -> DeviceLogEntryRecord:
+    timestamp = from_epoch(row["log_timestamp"], row["tz_offset"])
+    raw = row["raw"]
+    if raw is None:
+        raw = f"{timestamp.strftime(_RAW_TIMESTAMP_FORMAT)} {row['message']}"
+    return DeviceLogEntryRecord(
+        id=row["id"],
+        timestamp=timestamp,
+        message=row["message"],
+        raw=raw,
+        source=row["source"],
+    )
+
+
+# Epoch columns are exported as ISO 8601 again. Event times keep the offset
+# stored in the row's tz_offset; bookkeeping times are UTC.
+_EXPORT_EVENT_TIME_COLUMNS = frozenset({"timestamp", "log_timestamp", "start_time", "end_time"})
+_EXPORT_UTC_TIME_COLUMNS = frozenset({"ingested_at", "created_at", "updated_at"})
+
+
+def _export_select_list(table: str) -> str:
+    """Export columns of ``table`` followed by its tz_offset."""
+    expressions = [
+        f"COALESCE(raw, {_DERIVED_RAW_SQL})" if table == "device_log_entries" and column == "raw" else column
+        for column in ExportRepository.TABLE_COLUMNS[table]
+    ]
+    return ", ".join(expressions) + ", tz_offset"
+
+
+def _export_rows(table: str, rows: Iterable[Sequence[Any]]) -> Iterator[Tuple[Any, ...]]:
+    columns = ExportRepository.TABLE_COLUMNS[table]
+    event_indexes = [index for index, column in enumerate(columns) if column in _EXPORT_EVENT_TIME_COLUMNS]
+    utc_indexes = [index for index, column in enumerate(columns) if column in _EXPORT_UTC_TIME_COLUMNS]
+    for row in rows:
+        values = list(row[:-1])
+        for index in event_indexes:
+            if values[index] is not None:
+                values[index] = from_epoch(values[index], row[-1]).isoformat()
+        for index in utc_indexes:
+            if values[index] is not None:
+                values[index] = from_epoch(values[index], 0).isoformat()
+        yield tuple(values)
+
+
+def _outage_records(rows: Iterable[sqlite3.Row]) -> List[OutageRecord]:
+    return [
+        OutageRecord(
+            id=row["id"],
+            start_time=from_epoch(row["start_time"], row["tz_offset"]),
+            end_time=from_epoch(row["end_time"], row["tz_offset"]) if row["end_time"] is not None else None,
+            duration_seconds=row["duration_seconds"],
+            status=row["status"],
+            protocol=row["protocol"],
+        )
+        for row in rows
+    ]
+
+
+def _outage_values(outage: dict[str, Any]) -> tuple[Any, ...]:
+    start_epoch, tz_offset = to_epoch(outage["start_time"])
+    return (
+        start_epoch,
+        to_epoch(outage["end_time"])[0] if outage.get("end_time") else None,
+        outage.get("duration_seconds"),
+        outage.get("status", "closed"),
+        outage.get("start_log_entry_id"),
+        outage.get("end_log_entry_id"),
+        outage.get("protocol"),
+        tz_offset,
+    )
+
+
+def _store_checkpoint(
+    conn: sqlite3.Connection,
+    router_id: str,
+    checkpoint: OutageCheckpoint,
+    timestamp: int,
+) -> None:
+    open_state = {
+        protocol: {
+            "start": state["start"].isoformat() if state["start"] else None,
+            "start_entry_id": state["start_entry_id"],
+            "planned": state["planned"],
+        }
+        for protocol, state in checkpoint.open_state.items()
+    }
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO outage_calculator_state (
+            router_id, last_entry_id, last_timestamp, open_state, pending_planned, config_fingerprint, updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            router_id,
+            checkpoint.last_entry_id,
+            checkpoint.last_timestamp.isoformat() if checkpoint.last_timestamp else None,
+            json.dumps(open_state),
+            json.dumps(checkpoint.pending_planned),
+            checkpoint.config_fingerprint,
+            timestamp,
+        ),
+    )
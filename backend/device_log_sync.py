@@ -1,14 +1,24 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Optional
 
 from .database import DeviceLogRepository, OutageRepository
+from .event_hub import EventHub
 from .fritzbox_client import FritzboxClient
+from .metrics import DEVICE_LOG_ROWS_INGESTED, DEVICE_LOG_SYNC_PHASE_SECONDS, ROUTER_REQUEST_SECONDS
+from .models import DEFAULT_ROUTER_ID, DeviceLogBoundary, OutageCheckpoint
 from .outage_calculator import OutageCalculator
 
 
 class DeviceLogSync:
-    """Fetches device logs, persists them, and recalculates outages."""
+    """Fetches the device log of one router, persists it, and recalculates outages.
+
+    The fetched log text is fingerprinted; a sync whose text equals that of
+    the last completed sync is skipped before parsing, so the steady state
+    costs one TR-064 call and one hash.
+    """
 
     def __init__(
         self,
@@ -16,15 +26,189 @@ class DeviceLogSync:
         device_log_repository: DeviceLogRepository,
         outage_repository: OutageRepository,
         outage_calculator: OutageCalculator,
+        event_hub: Optional[EventHub] = None,
+        router_id: str = DEFAULT_ROUTER_ID,
     ) -> None:
+        self._router_id = router_id
         self._fritzbox_client = fritzbox_client
         self._device_log_repository = device_log_repository
         self._outage_repository = outage_repository
         self._outage_calculator = outage_calculator
+        self._event_hub = event_hub
+        self._checkpoint_verified = False
+        # Last entry id covered by the stored checkpoint, as of the last outage update
+        self._checkpoint_entry_id = 0
+        self._open_protocols: FrozenSet[str] = frozenset()
+        # High-water mark of ingested lines; loaded from the database on first sync
+        self._boundary: Optional[DeviceLogBoundary] = None
+        self._boundary_loaded = False
+        # Fingerprint of the log text of the last completed sync
+        self._log_fingerprint: Optional[bytes] = None
+        self.syncs_performed = 0
+        self.syncs_skipped = 0
+        self._fetch_seconds = ROUTER_REQUEST_SECONDS.labels(router_id, "GetDeviceLog")
+        self._parse_seconds = DEVICE_LOG_SYNC_PHASE_SECONDS.labels(router_id, "parse")
+        self._ingest_seconds = DEVICE_LOG_SYNC_PHASE_SECONDS.labels(router_id, "ingest")
+        self._calculate_seconds = DEVICE_LOG_SYNC_PHASE_SECONDS.labels(router_id, "calculate")
+        self._rows_ingested = DEVICE_LOG_ROWS_INGESTED.labels(router_id)
+
+    @property
+    def outage_open(self) -> bool:
+        """Whether the log, as of the last outage update, ends inside an outage."""
+        return bool(self._open_protocols)
+
+    @property
+    def open_protocols(self) -> FrozenSet[str]:
+        """Protocols with an open outage as of the last outage update."""
+        return self._open_protocols
 
     def run_once(self) -> None:
-        entries: Iterable[Dict[str, Any]] = self._fritzbox_client.fetch_device_log()
-        self._device_log_repository.ingest_entries(entries)
-        stored_entries = self._device_log_repository.list_entries()
-        outages = self._outage_calculator.calculate(stored_entries)
-        self._outage_repository.replace_outages(outages)
+        if not self._boundary_loaded:
+            self._boundary = self._device_log_repository.latest_boundary()
+            self._boundary_loaded = True
+
+        with self._fetch_seconds.time():
+            log_blob = self._fritzbox_client.fetch_device_log_blob()
+        fingerprint = hashlib.blake2b(log_blob.encode("utf-8"), digest_size=16).digest()
+        if fingerprint == self._log_fingerprint and self._checkpoint_verified:
+            self.syncs_skipped += 1
+            return
+
+        with self._parse_seconds.time():
+            entries: List[Dict[str, Any]] = self._fritzbox_client.parse_device_log(log_blob, boundary=self._boundary)
+        with self._ingest_seconds.time():
+            new_entry_ids = self._device_log_repository.ingest_new_entries(entries)
+        self._rows_ingested.inc(len(new_entry_ids))
+        if new_entry_ids:
+            self._publish_new_entries(new_entry_ids)
+        # Once the stored checkpoint is known to match this process, only rows
+        # behind it can change an outage. Besides the rows ingested now these
+        # are rows left over from a sync whose outage update failed.
+        if new_entry_ids or not self._checkpoint_verified or self._has_unprocessed_entries():
+            self._update_outages()
+        # Advanced only after the outage update succeeded: after a failure the
+        # same lines are parsed again and re-ingesting them is a no-op.
+        self._boundary = _advance_boundary(self._boundary, entries)
+        self._log_fingerprint = fingerprint
+        self.syncs_performed += 1
+
+    def recalculate_all(self) -> None:
+        """Rebuild all calculated outages from the complete device log."""
+        # Streams the log instead of materialising the full history.
+        stored_entries = self._device_log_repository.iter_entries()
+        with self._calculate_seconds.time():
+            outages, checkpoint = self._outage_calculator.calculate_incremental(stored_entries, None)
+        self._outage_repository.replace_outages(outages, checkpoint=checkpoint)
+        self._mark_checkpoint_verified(checkpoint)
+        if self._event_hub is not None:
+            self._event_hub.publish("outage", {"router_id": self._router_id, "action": "recalculated"})
+
+    def _update_outages(self) -> None:
+        checkpoint = self._outage_repository.load_checkpoint()
+        if checkpoint is None or checkpoint.config_fingerprint != self._outage_calculator.config_fingerprint:
+            self.recalculate_all()
+            return
+
+        new_entries = self._device_log_repository.list_entries_after(checkpoint.last_entry_id)
+        if not new_entries:
+            self._mark_checkpoint_verified(checkpoint)
+            return
+
+        # Entries older than the checkpoint (e.g. an imported archive) change
+        # the history behind it, so the incremental state no longer applies.
+        if checkpoint.last_timestamp is not None and new_entries[0].timestamp < checkpoint.last_timestamp:
+            self.recalculate_all()
+            return
+
+        previously_open = {
+            state["start_entry_id"] for state in checkpoint.open_state.values() if state["start"] is not None
+        }
+        with self._calculate_seconds.time():
+            outages, checkpoint = self._outage_calculator.calculate_incremental(new_entries, checkpoint)
+        self._outage_repository.upsert_outages(outages, checkpoint)
+        self._mark_checkpoint_verified(checkpoint)
+        self._publish_outage_changes(outages, previously_open)
+
+    def _mark_checkpoint_verified(self, checkpoint: OutageCheckpoint) -> None:
+        """Record that the stored ``checkpoint`` matches this process and covers its rows."""
+        self._checkpoint_verified = True
+        self._checkpoint_entry_id = checkpoint.last_entry_id
+        self._open_protocols = _open_protocols(checkpoint)
+
+    def _has_unprocessed_entries(self) -> bool:
+        latest_entry_id = self._device_log_repository.latest_entry_id()
+        return latest_entry_id is not None and latest_entry_id > self._checkpoint_entry_id
+
+    def _publish_new_entries(self, new_entry_ids: List[int]) -> None:
+        if self._event_hub is None or not self._event_hub.has_subscribers:
+            return
+        records = self._device_log_repository.list_entries_after(min(new_entry_ids) - 1)
+        self._event_hub.publish(
+            "device_log",
+            {
+                "router_id": self._router_id,
+                "entries": [
+                    {
+                        "timestamp": record.timestamp.isoformat(),
+                        "message": record.message,
+                        "raw": record.raw or record.message,
+                    }
+                    for record in records
+                ]
+            },
+        )
+
+    def _publish_outage_changes(self, outages: List[Dict[str, Any]], previously_open: set[Optional[int]]) -> None:
+        if self._event_hub is None:
+            return
+        for outage in outages:
+            if outage["end_time"] is not None:
+                action = "closed"
+            elif outage["start_log_entry_id"] not in previously_open:
+                action = "opened"
+            else:
+                continue
+            self._event_hub.publish(
+                "outage",
+                {
+                    "router_id": self._router_id,
+                    "action": action,
+                    "start": outage["start_time"].isoformat(),
+                    "end": outage["end_time"].isoformat() if outage["end_time"] else None,
+                    "duration_seconds": outage["duration_seconds"],
+                    "status": outage["status"],
+                    "protocol": outage["protocol"],
+                },
+            )
+
+
+def _open_protocols(checkpoint: Optional[OutageCheckpoint]) -> FrozenSet[str]:
+    if checkpoint is None:
+        return frozenset()
+    return frozenset(protocol for protocol, state in checkpoint.open_state.items() if state["start"] is not None)
+
+
+def _advance_boundary(
+    boundary: Optional[DeviceLogBoundary],
+    entries: List[Dict[str, Any]],
+) -> Optional[DeviceLogBoundary]:
+    """Move the high-water mark to the newest second among ``entries``."""
+    newest: Optional[datetime] = boundary.timestamp if boundary else None
+    messages = set(boundary.messages) if boundary else set()
+    for entry in entries:
+        timestamp = entry.get("timestamp")
+        message = entry.get("message")
+        if not timestamp or not message:
+            continue
+        try:
+            entry_time = datetime.fromisoformat(timestamp)
+        except ValueError:
+            continue
+        if newest is None or entry_time > newest:
+            newest = entry_time
+            messages = {message}
+        elif entry_time == newest:
+            messages.add(message)
+    if newest is None:
+        return None
+    return DeviceLogBoundary(timestamp=newest, messages=frozenset(messages))
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+
+class EventHub:
+    """Broadcasts events from worker threads to asyncio subscribers.
+
+    Publishers (the tracker and the device log sync run in executor threads)
+    hand events to the event loop with ``call_soon_threadsafe``; every
+    subscriber owns a bounded queue and loses its oldest events rather than
+    slowing down publishers when it cannot keep up.
+    """
+
+    def __init__(self, max_queue_size: int = 100) -> None:
+        self._max_queue_size = max_queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[asyncio.Queue[Dict[str, Any]]] = set()
+        self._subscriber_count = 0
+        self._count_lock = threading.Lock()
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    @property
+    def has_subscribers(self) -> bool:
+        return self._subscriber_count > 0
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Queue an event for all subscribers; safe to call from any thread."""
+        loop = self._loop
+        if loop is None or not self.has_subscribers or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._dispatch, {"event": event_type, "data": data})
+
+    async def subscribe(self, keepalive_seconds: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield events as they arrive, or ``None`` after ``keepalive_seconds`` of silence."""
+        queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=self._max_queue_size)
+        self._subscribers.add(queue)
+        with self._count_lock:
+            self._subscriber_count += 1
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers.discard(queue)
+            with self._count_lock:
+                self._subscriber_count -= 1
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
@@ -1,13 +1,34 @@
 from __future__ import annotations
 
 import re
+import threading
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 from fritzconnection import FritzConnection
+from fritzconnection.core.exceptions import (
+    FritzAuthorizationError,
+    FritzHttpInterfaceError,
+    FritzSecurityError,
+)
 from fritzconnection.lib.fritzstatus import FritzStatus
 
+from .models import DeviceLogBoundary
+
+
+T = TypeVar("T")
+
+# Failures after which the TR-064 session is discarded and rebuilt. Transport
+# errors raised by fritzconnection's HTTP layer derive from OSError.
+_SESSION_ERRORS = (
+    OSError,
+    FritzAuthorizationError,
+    FritzHttpInterfaceError,
+    FritzSecurityError,
+)
+
 
 @dataclass(frozen=True)
 class FritzBoxCredentials:
@@ -17,29 +38,70 @@ class FritzBoxCredentials:
 
 
 class FritzboxClient:
-    """Lightweight wrapper around FritzConnection / FritzStatus."""
+    """Lightweight wrapper around FritzConnection / FritzStatus.
+
+    The FritzConnection (and with it the parsed TR-064 service description) is
+    created lazily and reused for all calls until an authentication or
+    transport error forces a reconnect. With a ``cache_directory`` the service
+    description is also cached on disk, which speeds up reconnects and restarts.
+    """
 
     _LOG_LINE_PATTERN = re.compile(
         r"^(?P<date>\d{2}\.\d{2}\.\d{2})\s+(?P<time>\d{2}:\d{2}:\d{2})\s+(?P<message>.+)$"
     )
 
-    def __init__(self, credentials: FritzBoxCredentials) -> None:
-        self._credentials = credentials
+    _LOG_TIMESTAMP_FORMAT = "%d.%m.%y %H:%M:%S"
 
-    def _create_status_client(self) -> FritzStatus:
-        return FritzStatus(
-            address=self._credentials.address,
-            user=self._credentials.username,
-            password=self._credentials.password,
-        )
+    def __init__(
+        self,
+        credentials: FritzBoxCredentials,
+        cache_directory: Optional[Path] = None,
+    ) -> None:
+        self._credentials = credentials
+        self._cache_directory = cache_directory
+        self._session_lock = threading.Lock()
+        self._connection: Optional[FritzConnection] = None
+        self._status_client: Optional[FritzStatus] = None
 
     def _create_connection(self) -> FritzConnection:
+        cache_options: Dict[str, Any] = {}
+        if self._cache_directory is not None:
+            self._cache_directory.mkdir(parents=True, exist_ok=True)
+            cache_options = {"use_cache": True, "cache_directory": self._cache_directory}
         return FritzConnection(
             address=self._credentials.address,
             user=self._credentials.username,
             password=self._credentials.password,
+            **cache_options,
         )
 
+    def _session(self) -> Tuple[FritzConnection, FritzStatus, bool]:
+        with self._session_lock:
+            created = self._connection is None
+            if self._connection is None or self._status_client is None:
+                self._connection = self._create_connection()
+                self._status_client = FritzStatus(fc=self._connection)
+            return self._connection, self._status_client, created
+
+    def _reset_session(self, connection: FritzConnection) -> None:
+        with self._session_lock:
+            # Another thread may already have replaced the broken session.
+            if self._connection is connection:
+                self._connection = None
+                self._status_client = None
+
+    def _with_session(self, call: Callable[[FritzConnection, FritzStatus], T]) -> T:
+        while True:
+            connection, status_client, created = self._session()
+            try:
+                return call(connection, status_client)
+            except _SESSION_ERRORS:
+                self._reset_session(connection)
+                # A reused session may simply be stale (e.g. after a router
+                # reboot); retry once with a fresh one.
+                if created:
+                    raise
+
     def _collect_details(self, client: FritzStatus) -> Dict[str, Any]:
         def _safe_attr(attribute: str) -> Any:
             try:
@@ -65,23 +127,58 @@ class FritzboxClient:
         }
 
     def poll_status(self) -> Dict[str, Any]:
-        client = self._create_status_client()
-        return {
-            "connected": bool(getattr(client, "is_connected", False)),
-            "details": self._collect_details(client),
-        }
+        return self._with_session(
+            lambda _, client: {
+                "connected": bool(getattr(client, "is_connected", False)),
+                "details": self._collect_details(client),
+            }
+        )
 
-    def fetch_device_log(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        connection = self._create_connection()
-        result = connection.call_action("DeviceInfo:1", "GetDeviceLog")
-        log_blob = result.get("NewDeviceLog", "") if isinstance(result, dict) else ""
+    def fetch_device_log(
+        self,
+        limit: Optional[int] = None,
+        boundary: Optional[DeviceLogBoundary] = None,
+    ) -> List[Dict[str, Any]]:
+        """Fetch and parse the device log, newest line first."""
+        return self.parse_device_log(self.fetch_device_log_blob(), limit=limit, boundary=boundary)
+
+    def fetch_device_log_blob(self) -> str:
+        """Fetch the unparsed device log text."""
+        result = self._with_session(
+            lambda connection, _: connection.call_action("DeviceInfo:1", "GetDeviceLog")
+        )
+        return result.get("NewDeviceLog", "") if isinstance(result, dict) else ""
+
+    def parse_device_log(
+        self,
+        log_blob: str,
+        limit: Optional[int] = None,
+        boundary: Optional[DeviceLogBoundary] = None,
+    ) -> List[Dict[str, Any]]:
+        """Parse a device log text, newest line first.
+
+        With a ``boundary`` parsing stops once the stored lines of the
+        boundary second are reached. Lines that merely carry an older time
+        (the repeated hour after the DST change, a reset router clock) are
+        still returned; the database ignores those it already has.
+        """
+        boundary_prefix = boundary.timestamp.strftime(self._LOG_TIMESTAMP_FORMAT) if boundary else ""
         entries: List[Dict[str, Any]] = []
+        reached_boundary = False
         for line in log_blob.splitlines():
             cleaned = line.strip()
             if not cleaned:
                 continue
-            parsed = self._parse_log_line(cleaned)
-            entries.append(parsed)
+            if boundary is not None:
+                # Lines of the boundary second may interleave known and new
+                # messages; everything after that second is already stored.
+                if cleaned.startswith(boundary_prefix):
+                    if cleaned[len(boundary_prefix):].strip() in boundary.messages:
+                        reached_boundary = True
+                        continue
+                elif reached_boundary:
+                    break
+            entries.append(self._parse_log_line(cleaned))
         if limit is not None:
             return entries[:limit]
         return entries
@@ -96,7 +193,7 @@ class FritzboxClient:
         message = match.group("message")
 
         try:
-            naive_dt = datetime.strptime(f"{date_part} {time_part}", "%d.%m.%y %H:%M:%S")
+            naive_dt = datetime.strptime(f"{date_part} {time_part}", self._LOG_TIMESTAMP_FORMAT)
             timestamp = naive_dt.isoformat()
         except ValueError:
             timestamp = None
@@ -1,30 +1,74 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+import asyncio
+import base64
+import binascii
+import csv
+import io
+import json
+import logging
 import os
+import uuid
+from zoneinfo import ZoneInfo
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from starlette.status import HTTP_201_CREATED
 from fastapi.middleware.cors import CORSMiddleware
 
-from .config import settings
-from .database import DatabaseContext, DeviceLogRepository, OutageRepository, StatusRepository
+from .config import RouterConfig, load_routers, settings
+from .database import (
+    AvailabilityRepository,
+    Cursor,
+    DatabaseContext,
+    DeviceLogRepository,
+    ExportRepository,
+    JsonRow,
+    OutageRepository,
+    RetentionRepository,
+    StatusRepository,
+)
 from .device_log_sync import DeviceLogSync
+from .event_hub import EventHub
+from .metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    MetricsMiddleware,
+    StateCollector,
+    registry as metrics_registry,
+    render as render_metrics,
+)
 from .schemas import (
+    AvailabilityBucket,
+    AvailabilityGranularity,
+    AvailabilityResponse,
     ConnectivityStatus,
-    DeviceLogEntry,
     DeviceLogResponse,
+    ExportFormat,
+    ExportTable,
     OutageCreate,
     OutageCreateResponse,
     OutageListResponse,
     OutageWindow,
+    RouterInfo,
+    RouterListResponse,
     StatusResponse,
 )
-from .outage_calculator import OutageCalculator
+from .outage_calculator import OutageCalculator, merge_line_outages
 from .outage_config import OutageKeywords
+from .response_cache import ResponseCache
+from .retention import RetentionJob
+from .scheduler import Scheduler
 from .fritzbox_client import FritzBoxCredentials, FritzboxClient
+from .models import DEFAULT_ROUTER_ID
+from .router_registry import RouterMonitor, RouterRegistry
+from .timestamps import localize
 from .tracker import ConnectionTracker
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="StoerGeler Backend", root_path="/api")
 app.add_middleware(
     CORSMiddleware,
@@ -32,12 +76,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
+router_configs = load_routers(settings)
 db_context = DatabaseContext(settings.database_path)
-db_context.init_schema()
-status_repository = StatusRepository(db_context)
-device_log_repository = DeviceLogRepository(db_context)
-outage_repository = OutageRepository(db_context)
+# Log times stored before rows carried a router id belong to the router "default".
+db_context.init_schema(
+    next(
+        (router.zone for router in router_configs if router.router_id == DEFAULT_ROUTER_ID),
+        ZoneInfo(settings.router_timezone),
+    )
+)
+export_repository = ExportRepository(db_context)
+event_hub = EventHub()
+response_cache = ResponseCache()
+# Data versions restart at 0 with the process; the instance id keeps ETags
+# from an earlier run from matching.
+_INSTANCE_ID = uuid.uuid4().hex[:8]
 outage_calculator = OutageCalculator(
     cfg=OutageKeywords(
         planned_keywords=settings.outage_planned_keywords,
@@ -48,36 +103,103 @@ outage_calculator = OutageCalculator(
     )
 )
 
-fritzbox_client = FritzboxClient(
-    FritzBoxCredentials(
-        address=settings.fritzbox_address,
-        username=settings.fritzbox_username,
-        password=settings.fritzbox_password,
-    )
+# Status polls, log syncs and retention of all routers share one bounded pool,
+# so many routers neither starve the API threadpool nor hammer the database.
+scheduler = Scheduler(
+    max_workers=settings.router_poll_concurrency,
+    jitter_seconds=settings.scheduler_jitter_seconds,
+    default_timeout_seconds=settings.job_timeout_seconds,
+    max_backoff_seconds=settings.job_max_backoff_seconds,
 )
-device_log_sync = DeviceLogSync(
-    fritzbox_client=fritzbox_client,
-    device_log_repository=device_log_repository,
-    outage_repository=outage_repository,
-    outage_calculator=outage_calculator,
-)
-tracker = ConnectionTracker(
-    status_repository=status_repository,
-    fritzbox_client=fritzbox_client,
-    device_log_sync=device_log_sync,
-    poll_interval_seconds=settings.poll_interval_seconds,
-    device_log_poll_interval_seconds=settings.device_log_poll_interval_seconds,
+
+
+def _build_monitor(router: RouterConfig) -> RouterMonitor:
+    cache_directory = settings.fritzbox_cache_directory
+    if cache_directory is not None and router.router_id != DEFAULT_ROUTER_ID:
+        cache_directory = cache_directory / router.router_id
+    fritzbox_client = FritzboxClient(
+        FritzBoxCredentials(
+            address=router.address,
+            username=router.username,
+            password=router.password,
+        ),
+        cache_directory=cache_directory,
+    )
+    status_repository = StatusRepository(db_context, router.router_id, router.zone)
+    device_log_repository = DeviceLogRepository(db_context, router.router_id, router.zone)
+    outage_repository = OutageRepository(db_context, router.router_id, router.zone)
+    device_log_sync = DeviceLogSync(
+        fritzbox_client=fritzbox_client,
+        device_log_repository=device_log_repository,
+        outage_repository=outage_repository,
+        outage_calculator=outage_calculator,
+        event_hub=event_hub,
+        router_id=router.router_id,
+    )
+    tracker = ConnectionTracker(
+        status_repository=status_repository,
+        fritzbox_client=fritzbox_client,
+        device_log_sync=device_log_sync,
+        scheduler=scheduler,
+        poll_interval_seconds=settings.poll_interval_seconds,
+        device_log_poll_interval_seconds=settings.device_log_poll_interval_seconds,
+        status_max_age_seconds=settings.status_max_age_seconds,
+        event_hub=event_hub,
+        router_id=router.router_id,
+        fast_poll_interval_seconds=settings.fast_poll_interval_seconds,
+        stable_period_seconds=settings.stable_period_seconds,
+    )
+    return RouterMonitor(
+        config=router,
+        status_repository=status_repository,
+        device_log_repository=device_log_repository,
+        outage_repository=outage_repository,
+        availability_repository=AvailabilityRepository(db_context, router.router_id, router.zone),
+        device_log_sync=device_log_sync,
+        tracker=tracker,
+    )
+
+
+routers = RouterRegistry(_build_monitor(router) for router in router_configs)
+retention_job = RetentionJob(
+    RetentionRepository(db_context),
+    archive_directory=settings.archive_directory,
+    retention_days={
+        "status_events": settings.retention_status_events_days,
+        "device_log_entries": settings.retention_device_log_days,
+    },
 )
 
 
+def _handle_retention_error(exc: Exception) -> None:
+    logger.error("retention run failed", exc_info=exc)
+
+
+# Job statistics and connection state are read on every scrape.
+metrics_registry.register(StateCollector(scheduler, routers))
+
+
 @app.on_event("startup")
 async def _startup() -> None:
-    await tracker.start()
+    event_hub.attach_loop(asyncio.get_running_loop())
+    await routers.start()
+    if retention_job.enabled:
+        # A full VACUUM may legitimately take long; allow it the whole interval.
+        scheduler.schedule(
+            "retention",
+            settings.retention_interval_seconds,
+            retention_job.run_once,
+            on_error=_handle_retention_error,
+            timeout_seconds=settings.retention_interval_seconds,
+        )
+    await scheduler.start()
 
 
 @app.on_event("shutdown")
 async def _shutdown() -> None:
-    await tracker.stop()
+    await routers.stop()
+    await scheduler.stop()
+    db_context.close()
 
 
 @app.get("/health")
@@ -85,8 +207,28 @@ def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+def _monitor(router: Optional[str]) -> RouterMonitor:
+    try:
+        return routers.get(router)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Unbekannter Router: {router}") from exc
+
+
+@app.get("/routers", response_model=RouterListResponse)
+def list_routers() -> RouterListResponse:
+    return RouterListResponse(
+        routers=[
+            RouterInfo(id=monitor.router_id, name=monitor.config.name, address=monitor.config.address)
+            for monitor in routers
+        ]
+    )
+
+
 @app.get("/status", response_model=StatusResponse)
-def current_status() -> StatusResponse:
+def current_status(
+    router: Optional[str] = Query(default=None, description="Router-ID (Standard: erster konfigurierter Router)"),
+) -> StatusResponse:
+    tracker = _monitor(router).tracker
     try:
         result = tracker.poll_now()
     except Exception as exc:  # noqa: BLE001
@@ -94,42 +236,181 @@ def current_status() -> StatusResponse:
     return StatusResponse(**result)
 
 
+def _encode_cursor(timestamp: int, row_id: int) -> str:
+    raw = f"{timestamp}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(value: Optional[str]) -> Optional[Cursor]:
+    if value is None:
+        return None
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").rsplit("|", 1)
+        return int(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor") from exc
+
+
+def _json_list_body(key: str, rows: Sequence[JsonRow], next_cursor: Optional[str]) -> bytes:
+    """Join rows SQLite already rendered as JSON into the list response.
+
+    Skips building a Pydantic model per row and FastAPI's ``response_model``
+    validation, which dominate large lists; the route's ``response_model``
+    still documents the shape, and the bytes equal FastAPI's own output.
+    """
+    items = ",".join(row[2] for row in rows)
+    return f'{{"{key}":[{items}],"next_cursor":{json.dumps(next_cursor)}}}'.encode("utf-8")
+
+
+def _not_modified(request: Request, etag: str, modified: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _cached_json(request: Request, render: Callable[[], bytes]) -> Response:
+    """Serve ``render()`` with validators derived from the data version.
+
+    Clients holding the current version get a 304 without any work; other
+    requests for the same URL and version reuse the rendered body.
+    """
+    version, modified = db_context.data_version
+    etag = f'"{_INSTANCE_ID}-{version}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, etag, modified):
+        return Response(status_code=304, headers=headers)
+
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), version)
+    body = response_cache.get(key)
+    if body is None:
+        body = render()
+        response_cache.put(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _page_cursors(before: Optional[str], after: Optional[str]) -> tuple[Optional[Cursor], Optional[Cursor]]:
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="before und after schließen sich aus")
+    return _decode_cursor(before), _decode_cursor(after)
+
+
 @app.get("/device-log", response_model=DeviceLogResponse)
 def device_log(
+    request: Request,
     limit: Optional[int] = Query(
         default=None,
         ge=1,
         le=500,
         description="Optional: Anzahl der Logzeilen beschränken (1-500)",
-    )
-) -> DeviceLogResponse:
-    try:
-        records = device_log_repository.list_entries(limit=limit, ascending=False)
-    except Exception as exc:  # noqa: BLE001
-        raise HTTPException(status_code=503, detail=str(exc)) from exc
-    return DeviceLogResponse(
-        entries=[
-            DeviceLogEntry(
-                timestamp=record.timestamp,
-                message=record.message,
-                raw=record.raw or record.message,
+    ),
+    before: Optional[str] = Query(
+        default=None, description="Cursor: nur ältere Einträge (nächste Seite)"
+    ),
+    after: Optional[str] = Query(
+        default=None, description="Cursor: nur neuere Einträge"
+    ),
+    start: Optional[datetime] = Query(default=None, description="Optional: frühester Zeitstempel"),
+    end: Optional[datetime] = Query(default=None, description="Optional: spätester Zeitstempel"),
+    router: Optional[str] = Query(default=None, description="Router-ID (Standard: erster konfigurierter Router)"),
+) -> Response:
+    device_log_repository = _monitor(router).device_log_repository
+    before_cursor, after_cursor = _page_cursors(before, after)
+
+    def _render() -> bytes:
+        try:
+            rows = device_log_repository.list_entries_json(
+                limit=limit,
+                ascending=False,
+                start=start,
+                end=end,
+                before=before_cursor,
+                after=after_cursor,
             )
-            for record in records
-        ]
-    )
+        except Exception as exc:  # noqa: BLE001
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+        next_cursor = None
+        if limit is not None and len(rows) == limit:
+            # Entries are newest first; walking towards newer entries continues at the top.
+            edge_id, edge_timestamp, _ = rows[0] if after_cursor is not None else rows[-1]
+            next_cursor = _encode_cursor(edge_timestamp, edge_id)
+        return _json_list_body("entries", rows, next_cursor)
+
+    return _cached_json(request, _render)
 
 
 @app.get("/outages", response_model=OutageListResponse)
 def outage_windows(
+    request: Request,
     limit: Optional[int] = Query(
-        default=300,
+        default=None,
         ge=1,
         le=1000,
-        description="Optional: Anzahl der Logzeilen, die ausgewertet werden sollen",
+        description="Optional: maximale Anzahl Störungen pro Seite (1-1000)",
     ),
+    before: Optional[str] = Query(
+        default=None, description="Cursor: nur früher beginnende Störungen"
+    ),
+    after: Optional[str] = Query(
+        default=None, description="Cursor: nur später beginnende Störungen (nächste Seite)"
+    ),
+    start: Optional[datetime] = Query(default=None, description="Optional: frühester Störungsbeginn"),
+    end: Optional[datetime] = Query(default=None, description="Optional: spätester Störungsbeginn"),
+    router: Optional[str] = Query(default=None, description="Router-ID (Standard: erster konfigurierter Router)"),
+) -> Response:
+    outage_repository = _monitor(router).outage_repository
+    before_cursor, after_cursor = _page_cursors(before, after)
+
+    def _render() -> bytes:
+        try:
+            rows = outage_repository.list_outages_json(
+                limit=limit,
+                start=start,
+                end=end,
+                before=before_cursor,
+                after=after_cursor,
+            )
+        except Exception as exc:  # noqa: BLE001
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+        next_cursor = None
+        if limit is not None and len(rows) == limit:
+            # Outages are oldest first; walking towards older outages continues at the top.
+            edge_id, edge_start, _ = rows[0] if before_cursor is not None else rows[-1]
+            next_cursor = _encode_cursor(edge_start, edge_id)
+        return _json_list_body("outages", rows, next_cursor)
+
+    return _cached_json(request, _render)
+
+
+@app.get("/outages/merged", response_model=OutageListResponse)
+def merged_outage_windows(
+    start: Optional[datetime] = Query(default=None, description="Beginn (Standard: 30 Tage vor end)"),
+    end: Optional[datetime] = Query(default=None, description="Ende (Standard: jetzt)"),
+    router: Optional[str] = Query(default=None, description="Router-ID (Standard: erster konfigurierter Router)"),
 ) -> OutageListResponse:
+    """Line outages overlapping [start, end): ipv4/ipv6 outages of one drop form one window."""
+    monitor = _monitor(router)
+    outage_repository = monitor.outage_repository
+    end = localize(end, monitor.config.zone) if end else datetime.now(timezone.utc)
+    start = localize(start, monitor.config.zone) if start else end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start muss vor end liegen")
     try:
-        stored_outages = outage_repository.list_outages()
+        stored_outages = outage_repository.list_overlapping(start, end)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=503, detail=str(exc)) from exc
 
@@ -139,40 +420,92 @@ def outage_windows(
             end=record.end_time,
             duration_seconds=record.duration_seconds,
             status=record.status,
+            protocol=record.protocol,
         )
-        for record in stored_outages
+        for record in merge_line_outages(stored_outages)
     ]
     return OutageListResponse(outages=windows)
 
 
 @app.post("/outages", response_model=OutageCreateResponse, status_code=HTTP_201_CREATED)
-def create_outage(body: OutageCreate) -> OutageCreateResponse:
+def create_outage(
+    body: OutageCreate,
+    router: Optional[str] = Query(default=None, description="Router-ID (Standard: erster konfigurierter Router)"),
+) -> OutageCreateResponse:
+    monitor = _monitor(router)
+    outage_repository = monitor.outage_repository
+    # Times without an offset are the router's local time.
+    start = localize(body.start, monitor.config.zone)
+    end = localize(body.end, monitor.config.zone) if body.end else None
     try:
         outage_id = outage_repository.create_outage(
-            start_time=body.start,
-            end_time=body.end,
+            start_time=start,
+            end_time=end,
             status=body.status,
         )
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=503, detail=str(exc)) from exc
 
     duration = None
-    if body.end:
-        duration = max(1, int((body.end - body.start).total_seconds()))
+    if end:
+        duration = max(1, int((end - start).total_seconds()))
 
     return OutageCreateResponse(
         id=outage_id,
         outage=OutageWindow(
-            start=body.start,
-            end=body.end,
+            start=start,
+            end=end,
             duration_seconds=duration,
             status=body.status,
         ),
     )
 
 
+@app.get("/availability", response_model=AvailabilityResponse)
+def availability(
+    granularity: AvailabilityGranularity = Query(
+        default=AvailabilityGranularity.day, description="hour|day|month"
+    ),
+    start: Optional[datetime] = Query(default=None, description="Beginn (Standard: 30 Tage vor end)"),
+    end: Optional[datetime] = Query(default=None, description="Ende (Standard: jetzt)"),
+    router: Optional[str] = Query(default=None, description="Router-ID (Standard: erster konfigurierter Router)"),
+) -> AvailabilityResponse:
+    monitor = _monitor(router)
+    availability_repository = monitor.availability_repository
+    end = localize(end, monitor.config.zone) if end else datetime.now(timezone.utc)
+    start = localize(start, monitor.config.zone) if start else end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start muss vor end liegen")
+    try:
+        records = availability_repository.list_buckets(granularity.value, start, end)
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+    buckets = []
+    for record in records:
+        bucket_seconds = (record.bucket_end - record.bucket_start).total_seconds()
+        downtime_share = min(1.0, record.downtime_seconds / bucket_seconds)
+        buckets.append(
+            AvailabilityBucket(
+                start=record.bucket_start,
+                end=record.bucket_end,
+                protocol=record.protocol,
+                downtime_seconds=record.downtime_seconds,
+                planned_downtime_seconds=record.planned_downtime_seconds,
+                unplanned_downtime_seconds=record.downtime_seconds - record.planned_downtime_seconds,
+                outage_count=record.outage_count,
+                planned_outage_count=record.planned_outage_count,
+                availability_percent=round(100 * (1 - downtime_share), 4),
+            )
+        )
+    return AvailabilityResponse(granularity=granularity, start=start, end=end, buckets=buckets)
+
+
 @app.get("/connection-check", response_model=ConnectivityStatus)
-def connection_check() -> ConnectivityStatus:
+def connection_check(
+    router: Optional[str] = Query(default=None, description="Router-ID (Standard: erster konfigurierter Router)"),
+) -> ConnectivityStatus:
+    tracker = _monitor(router).tracker
     try:
         status = tracker.check_connection()
     except Exception as exc:  # noqa: BLE001
@@ -180,6 +513,90 @@ def connection_check() -> ConnectivityStatus:
     return ConnectivityStatus(**status)
 
 
+@app.get("/events")
+async def events(
+    router: Optional[str] = Query(default=None, description="Optional: nur Ereignisse dieses Routers"),
+) -> StreamingResponse:
+    """Server-Sent Events stream of status transitions, new log lines and outage changes.
+
+    Every event carries the ``router_id`` it belongs to.
+    """
+    router_id = _monitor(router).router_id if router is not None else None
+
+    async def _stream() -> AsyncIterator[str]:
+        async for event in event_hub.subscribe(keepalive_seconds=15):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            if router_id is not None and event["data"].get("router_id") != router_id:
+                continue
+            payload = json.dumps(event["data"], default=str)
+            yield f"event: {event['event']}\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_EXPORT_CHUNK_ROWS = 500
+
+
+def _ndjson_chunks(columns: Sequence[str], rows: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+    lines: list[str] = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        if len(lines) >= _EXPORT_CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines.clear()
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _csv_chunks(columns: Sequence[str], rows: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= _EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+@app.get("/export/{table}")
+def export_table(
+    table: ExportTable,
+    format: ExportFormat = Query(default=ExportFormat.ndjson, description="ndjson|csv"),
+    router: Optional[str] = Query(default=None, description="Optional: nur Daten dieses Routers"),
+) -> StreamingResponse:
+    """Stream a complete table as NDJSON or CSV with constant memory."""
+    router_id = _monitor(router).router_id if router is not None else None
+    columns = ExportRepository.TABLE_COLUMNS[table.value]
+    rows = export_repository.iter_rows(table.value, router_id)
+    if format is ExportFormat.csv:
+        body, media_type = _csv_chunks(columns, rows), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _ndjson_chunks(columns, rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table.value}.{format.value}"'},
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    # Runs on the event loop, where the scheduler updates its job statistics.
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/version")
 def version() -> Dict[str, str]:
     return {
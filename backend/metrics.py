@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, TypeVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+if TYPE_CHECKING:
+    from .router_registry import RouterRegistry
+    from .scheduler import Scheduler
+
+T = TypeVar("T")
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Seconds; covers SQLite statements (ms) up to slow TR-064 calls and full recalculations.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The per-series creation timestamps would double the output of the many
+# repository method histograms.
+disable_created_metrics()
+registry = CollectorRegistry()
+
+ROUTER_REQUEST_SECONDS = Histogram(
+    "stoergeler_router_request_seconds",
+    "Duration of TR-064 calls to the router.",
+    ("router", "action"),
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+DEVICE_LOG_SYNC_PHASE_SECONDS = Histogram(
+    "stoergeler_device_log_sync_phase_seconds",
+    "Duration of the phases of a device log sync.",
+    ("router", "phase"),
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+DEVICE_LOG_ROWS_INGESTED = Counter(
+    "stoergeler_device_log_rows_ingested",
+    "Device log lines newly stored.",
+    ("router",),
+    registry=registry,
+)
+POLL_ERRORS = Counter(
+    "stoergeler_poll_errors",
+    "Failed status polls and device log syncs.",
+    ("router", "job"),
+    registry=registry,
+)
+DB_QUERY_SECONDS = Histogram(
+    "stoergeler_db_query_seconds",
+    "Duration of SQLite repository methods.",
+    ("method",),
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "stoergeler_http_request_seconds",
+    "Time until the response headers of an API request are sent.",
+    ("method", "route", "status"),
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+
+
+def render() -> bytes:
+    """The metrics in the Prometheus text exposition format."""
+    return generate_latest(registry)
+
+
+def timed_methods(histogram: Histogram) -> Callable[[type], type]:
+    """Class decorator observing the duration of every public method in ``histogram``.
+
+    The single label is ``Class.method``. Generator methods are left alone,
+    since calling them does not run any query yet.
+    """
+
+    def decorate(cls: type) -> type:
+        for attribute, function in list(vars(cls).items()):
+            if attribute.startswith("_") or not inspect.isfunction(function):
+                continue
+            if inspect.isgeneratorfunction(function):
+                continue
+            setattr(cls, attribute, _timed(function, histogram.labels(f"{cls.__name__}.{attribute}")))
+        return cls
+
+    return decorate
+
+
+def _timed(function: Callable[..., T], child: Histogram) -> Callable[..., T]:
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+class StateCollector(Collector):
+    """Reads job statistics and connection state from the scheduler and routers on every scrape."""
+
+    def __init__(self, scheduler: Scheduler, routers: RouterRegistry) -> None:
+        self._scheduler = scheduler
+        self._routers = routers
+
+    def collect(self) -> Iterator[Metric]:
+        jobs = self._scheduler.jobs
+        runs = CounterMetricFamily("stoergeler_job_runs", "Completed runs of a background job.", labels=("job",))
+        failures = CounterMetricFamily(
+            "stoergeler_job_failures", "Failed or timed-out runs of a background job.", labels=("job",)
+        )
+        timeouts = CounterMetricFamily(
+            "stoergeler_job_timeouts", "Runs of a background job that exceeded their timeout.", labels=("job",)
+        )
+        skipped = CounterMetricFamily(
+            "stoergeler_job_skipped",
+            "Ticks of a background job skipped because it was still running or backing off.",
+            labels=("job", "reason"),
+        )
+        last_duration = GaugeMetricFamily(
+            "stoergeler_job_last_duration_seconds",
+            "Duration of the last completed run of a background job.",
+            labels=("job",),
+        )
+        interval = GaugeMetricFamily(
+            "stoergeler_job_interval_seconds",
+            "Current interval of a background job; shorter while a connection is unstable.",
+            labels=("job",),
+        )
+        for job in jobs:
+            runs.add_metric((job.name,), job.runs)
+            failures.add_metric((job.name,), job.failures)
+            timeouts.add_metric((job.name,), job.timeouts)
+            skipped.add_metric((job.name, "busy"), job.skipped_busy)
+            skipped.add_metric((job.name, "backoff"), job.skipped_backoff)
+            if job.last_duration_seconds is not None:
+                last_duration.add_metric((job.name,), job.last_duration_seconds)
+            interval.add_metric((job.name,), job.interval_seconds)
+        yield from (runs, failures, timeouts, skipped, last_duration, interval)
+
+        syncs = CounterMetricFamily(
+            "stoergeler_device_log_syncs",
+            "Device log syncs that processed the log or were skipped because it was unchanged.",
+            labels=("router", "result"),
+        )
+        status = GaugeMetricFamily(
+            "stoergeler_connection_status",
+            "1 for the last recorded status of a router (online, offline or error).",
+            labels=("router", "status"),
+        )
+        outage_open = GaugeMetricFamily(
+            "stoergeler_outage_open",
+            "1 while the device log of a router ends inside an outage of the protocol.",
+            labels=("router", "protocol"),
+        )
+        for monitor in self._routers:
+            sync = monitor.device_log_sync
+            syncs.add_metric((monitor.router_id, "performed"), sync.syncs_performed)
+            syncs.add_metric((monitor.router_id, "skipped"), sync.syncs_skipped)
+            for value in ("online", "offline", "error"):
+                status.add_metric((monitor.router_id, value), float(monitor.tracker.last_status == value))
+            for protocol in ("ipv4", "ipv6"):
+                outage_open.add_metric((monitor.router_id, protocol), float(protocol in sync.open_protocols))
+        yield from (syncs, status, outage_open)
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing API request latency per route template.
+
+    Latency ends when the response headers are sent, so streamed responses
+    (``/events``, exports) are measured up to their first byte.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int) -> None:
+            route = scope.get("route")
+            # Unmatched paths share one label so scans cannot grow the series.
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], template, str(status)).observe(
+                time.perf_counter() - started
+            )
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not observed:
+                observe(500)
+            raise
@@ -0,0 +1,505 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone, tzinfo
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from .availability import rebuild_rollups
+from .models import DEFAULT_ROUTER_ID, DEFAULT_ROUTER_TIMEZONE
+from .timestamps import localize, to_epoch
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    # Called with the connection, plus the router time zone if ``uses_router_zone``.
+    apply: Callable[..., None]
+    uses_router_zone: bool = False
+
+
+def _column_names(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _create_base_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS status_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            status TEXT NOT NULL,
+            details TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS device_log_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            log_timestamp TEXT NOT NULL,
+            message TEXT NOT NULL,
+            raw TEXT,
+            source TEXT DEFAULT 'tr064',
+            ingested_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (log_timestamp, message)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_time TEXT NOT NULL,
+            end_time TEXT,
+            duration_seconds INTEGER,
+            status TEXT NOT NULL,
+            source TEXT NOT NULL DEFAULT 'calculated',
+            start_log_entry_id INTEGER,
+            end_log_entry_id INTEGER,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (start_log_entry_id) REFERENCES device_log_entries(id) ON DELETE SET NULL,
+            FOREIGN KEY (end_log_entry_id) REFERENCES device_log_entries(id) ON DELETE SET NULL
+        )
+        """
+    )
+
+
+def _add_outage_source(conn: sqlite3.Connection) -> None:
+    # Databases created before manual outages existed lack this column.
+    if "source" not in _column_names(conn, "outages"):
+        conn.execute("ALTER TABLE outages ADD COLUMN source TEXT NOT NULL DEFAULT 'calculated'")
+
+
+def _create_calculator_state(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outage_calculator_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_entry_id INTEGER NOT NULL,
+            last_timestamp TEXT,
+            open_state TEXT NOT NULL,
+            pending_planned TEXT NOT NULL,
+            config_fingerprint TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+def _create_time_indexes(conn: sqlite3.Connection) -> None:
+    # device_log_entries.log_timestamp is already covered by its UNIQUE constraint.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_status_events_timestamp ON status_events (timestamp)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outages_start_time ON outages (start_time)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_outages_source_start_entry"
+        " ON outages (source, start_log_entry_id)"
+    )
+
+
+def _create_keyset_indexes(conn: sqlite3.Connection) -> None:
+    # Index entries are ordered by (column, rowid), matching the
+    # (timestamp, id) keyset used for pagination.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_device_log_entries_timestamp"
+        " ON device_log_entries (log_timestamp)"
+    )
+
+
+def _create_availability_rollups(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS availability_rollups (
+            granularity TEXT NOT NULL,
+            bucket_start TEXT NOT NULL,
+            protocol TEXT NOT NULL,
+            downtime_seconds INTEGER NOT NULL DEFAULT 0,
+            planned_downtime_seconds INTEGER NOT NULL DEFAULT 0,
+            outage_count INTEGER NOT NULL DEFAULT 0,
+            planned_outage_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket_start, protocol)
+        ) WITHOUT ROWID
+        """
+    )
+    # Open outages are added to rollup queries on the fly.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_outages_open ON outages (start_time) WHERE end_time IS NULL"
+    )
+
+
+def _add_outage_protocol(conn: sqlite3.Connection) -> None:
+    if "protocol" not in _column_names(conn, "outages"):
+        conn.execute("ALTER TABLE outages ADD COLUMN protocol TEXT")
+    # Dropping the checkpoint makes the next sync recalculate all outages,
+    # which fills in the protocol of existing calculated rows. The rollups are
+    # rebuilt once timestamps are converted (migration 8).
+    conn.execute("DELETE FROM outage_calculator_state")
+
+
+def _iso_to_epoch(value: Optional[str], zone: tzinfo) -> Tuple[int, int]:
+    # Naive values are router log times, written in the router's local time.
+    if not value:
+        raise ValueError("missing timestamp")
+    return to_epoch(localize(datetime.fromisoformat(value), zone))
+
+
+def _utc_iso_to_epoch(value: Optional[str]) -> Optional[int]:
+    # created_at/updated_at/ingested_at were written as naive UTC.
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def _rebuild_table(
+    conn: sqlite3.Connection,
+    table: str,
+    create_sql: str,
+    columns: Sequence[str],
+    rows: Sequence[Tuple[Any, ...]],
+) -> None:
+    """Replace ``table`` by a table created from ``create_sql``, keeping ids and AUTOINCREMENT state."""
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    conn.execute(create_sql.format(table=f"{table}_new"))
+    placeholders = ", ".join("?" for _ in columns)
+    conn.executemany(
+        f"INSERT INTO {table}_new ({', '.join(columns)}) VALUES ({placeholders})",
+        rows,
+    )
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    if sequence is not None:
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?",
+            (sequence[0], table),
+        )
+
+
+def _store_epoch_timestamps(conn: sqlite3.Connection, zone: tzinfo) -> None:
+    # ISO text mixed naive local router times with aware UTC tracker times, so
+    # string order was not time order. Rows whose timestamps cannot be parsed
+    # were skipped by every read path; they are kept in unconverted_rows as
+    # JSON objects of their original columns.
+    conn.execute(
+        """
+        CREATE TABLE unconverted_rows (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            row TEXT NOT NULL,
+            PRIMARY KEY (table_name, row_id)
+        )
+        """
+    )
+    unconverted: List[Tuple[str, int, str]] = []
+
+    def _keep_unconverted(table: str, columns: Sequence[str], row: Sequence[Any]) -> None:
+        unconverted.append((table, row[0], json.dumps(dict(zip(columns, row)), ensure_ascii=False)))
+
+    status_columns = ("id", "timestamp", "status", "details")
+    status_rows = []
+    for row in conn.execute(f"SELECT {', '.join(status_columns)} FROM status_events"):
+        try:
+            status_rows.append((row[0], *_iso_to_epoch(row[1], zone), row[2], row[3]))
+        except ValueError:
+            _keep_unconverted("status_events", status_columns, row)
+    _rebuild_table(
+        conn,
+        "status_events",
+        """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            tz_offset INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            details TEXT
+        )
+        """,
+        ("id", "timestamp", "tz_offset", "status", "details"),
+        status_rows,
+    )
+
+    log_columns = ("id", "log_timestamp", "message", "raw", "source", "ingested_at")
+    log_rows = []
+    for row in conn.execute(f"SELECT {', '.join(log_columns)} FROM device_log_entries"):
+        try:
+            log_rows.append((row[0], *_iso_to_epoch(row[1], zone), *row[2:5], _utc_iso_to_epoch(row[5])))
+        except ValueError:
+            _keep_unconverted("device_log_entries", log_columns, row)
+    _rebuild_table(
+        conn,
+        "device_log_entries",
+        """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            log_timestamp INTEGER NOT NULL,
+            tz_offset INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            raw TEXT,
+            source TEXT DEFAULT 'tr064',
+            ingested_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            UNIQUE (log_timestamp, message)
+        )
+        """,
+        ("id", "log_timestamp", "tz_offset", "message", "raw", "source", "ingested_at"),
+        log_rows,
+    )
+
+    outage_columns = (
+        "id",
+        "start_time",
+        "end_time",
+        "duration_seconds",
+        "status",
+        "source",
+        "protocol",
+        "start_log_entry_id",
+        "end_log_entry_id",
+        "created_at",
+        "updated_at",
+    )
+    outage_rows = []
+    for row in conn.execute(f"SELECT {', '.join(outage_columns)} FROM outages"):
+        try:
+            start_time, tz_offset = _iso_to_epoch(row[1], zone)
+            end_time = _iso_to_epoch(row[2], zone)[0] if row[2] else None
+            outage_rows.append(
+                (
+                    row[0],
+                    start_time,
+                    end_time,
+                    tz_offset,
+                    *row[3:9],
+                    _utc_iso_to_epoch(row[9]),
+                    _utc_iso_to_epoch(row[10]),
+                )
+            )
+        except ValueError:
+            _keep_unconverted("outages", outage_columns, row)
+    _rebuild_table(
+        conn,
+        "outages",
+        """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_time INTEGER NOT NULL,
+            end_time INTEGER,
+            tz_offset INTEGER NOT NULL,
+            duration_seconds INTEGER,
+            status TEXT NOT NULL,
+            source TEXT NOT NULL DEFAULT 'calculated',
+            protocol TEXT,
+            start_log_entry_id INTEGER,
+            end_log_entry_id INTEGER,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL,
+            FOREIGN KEY (start_log_entry_id) REFERENCES device_log_entries(id) ON DELETE SET NULL,
+            FOREIGN KEY (end_log_entry_id) REFERENCES device_log_entries(id) ON DELETE SET NULL
+        )
+        """,
+        (
+            "id",
+            "start_time",
+            "end_time",
+            "tz_offset",
+            "duration_seconds",
+            "status",
+            "source",
+            "protocol",
+            "start_log_entry_id",
+            "end_log_entry_id",
+            "created_at",
+            "updated_at",
+        ),
+        outage_rows,
+    )
+
+    conn.executemany("INSERT INTO unconverted_rows VALUES (?, ?, ?)", unconverted)
+
+    # The checkpoint itself stays ISO text like the JSON state next to it;
+    # recreating the table only changes updated_at and forces one full
+    # recalculation.
+    conn.execute("DROP TABLE outage_calculator_state")
+    conn.execute(
+        """
+        CREATE TABLE outage_calculator_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_entry_id INTEGER NOT NULL,
+            last_timestamp TEXT,
+            open_state TEXT NOT NULL,
+            pending_planned TEXT NOT NULL,
+            config_fingerprint TEXT NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        """
+    )
+
+    # Dropping the tables dropped their indexes as well.
+    _create_time_indexes(conn)
+    _create_keyset_indexes(conn)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_outages_open ON outages (start_time) WHERE end_time IS NULL"
+    )
+    # Bounds overlap queries by the longest span; the stored duration is
+    # wall-clock time and can be an hour short of it across a DST change. The
+    # rollups are rebuilt once rows carry a router id (migration 10).
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outages_span ON outages (end_time - start_time)")
+
+
+def _mark_missing_raw_lines(conn: sqlite3.Connection) -> None:
+    # A NULL raw line now means "rebuild it from timestamp and message";
+    # entries that never had one keep reading back as their message.
+    conn.execute("UPDATE device_log_entries SET raw = '' WHERE raw IS NULL")
+
+
+def _add_router_id(conn: sqlite3.Connection) -> None:
+    # Existing rows belong to the router configured through FRITZBOX_*.
+    default = f"'{DEFAULT_ROUTER_ID}'"
+    for table in ("status_events", "outages"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN router_id TEXT NOT NULL DEFAULT {default}")
+
+    # The duplicate check of log lines becomes per router.
+    log_columns = ("id", "router_id", "log_timestamp", "tz_offset", "message", "raw", "source", "ingested_at")
+    _rebuild_table(
+        conn,
+        "device_log_entries",
+        f"""
+        CREATE TABLE {{table}} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            router_id TEXT NOT NULL DEFAULT {default},
+            log_timestamp INTEGER NOT NULL,
+            tz_offset INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            raw TEXT,
+            source TEXT DEFAULT 'tr064',
+            ingested_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            UNIQUE (router_id, log_timestamp, message)
+        )
+        """,
+        log_columns,
+        conn.execute(
+            f"SELECT id, {default}, {', '.join(log_columns[2:])} FROM device_log_entries"
+        ).fetchall(),
+    )
+
+    checkpoint = conn.execute(
+        "SELECT last_entry_id, last_timestamp, open_state, pending_planned, config_fingerprint, updated_at"
+        " FROM outage_calculator_state"
+    ).fetchone()
+    conn.execute("DROP TABLE outage_calculator_state")
+    conn.execute(
+        """
+        CREATE TABLE outage_calculator_state (
+            router_id TEXT PRIMARY KEY,
+            last_entry_id INTEGER NOT NULL,
+            last_timestamp TEXT,
+            open_state TEXT NOT NULL,
+            pending_planned TEXT NOT NULL,
+            config_fingerprint TEXT NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        """
+    )
+    if checkpoint is not None:
+        conn.execute(
+            "INSERT INTO outage_calculator_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (DEFAULT_ROUTER_ID, *checkpoint),
+        )
+
+    conn.execute("DROP TABLE availability_rollups")
+    conn.execute(
+        """
+        CREATE TABLE availability_rollups (
+            router_id TEXT NOT NULL,
+            granularity TEXT NOT NULL,
+            bucket_start TEXT NOT NULL,
+            protocol TEXT NOT NULL,
+            downtime_seconds INTEGER NOT NULL DEFAULT 0,
+            planned_downtime_seconds INTEGER NOT NULL DEFAULT 0,
+            outage_count INTEGER NOT NULL DEFAULT 0,
+            planned_outage_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (router_id, granularity, bucket_start, protocol)
+        ) WITHOUT ROWID
+        """
+    )
+    rebuild_rollups(conn)
+
+    # Every query is scoped to one router, so the router id leads each index.
+    for index in (
+        "idx_status_events_timestamp",
+        "idx_outages_start_time",
+        "idx_outages_open",
+        "idx_outages_span",
+    ):
+        conn.execute(f"DROP INDEX IF EXISTS {index}")
+    conn.execute("CREATE INDEX idx_status_events_timestamp ON status_events (router_id, timestamp)")
+    conn.execute(
+        "CREATE INDEX idx_device_log_entries_timestamp ON device_log_entries (router_id, log_timestamp)"
+    )
+    # New log lines of one router are read by id range.
+    conn.execute("CREATE INDEX idx_device_log_entries_router_id ON device_log_entries (router_id, id)")
+    conn.execute("CREATE INDEX idx_outages_start_time ON outages (router_id, start_time)")
+    conn.execute(
+        "CREATE INDEX idx_outages_open ON outages (router_id, start_time) WHERE end_time IS NULL"
+    )
+    conn.execute("CREATE INDEX idx_outages_span ON outages (router_id, end_time - start_time)")
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(1, "create_base_tables", _create_base_tables),
+    Migration(2, "add_outage_source", _add_outage_source),
+    Migration(3, "create_calculator_state", _create_calculator_state),
+    Migration(4, "create_time_indexes", _create_time_indexes),
+    Migration(5, "create_keyset_indexes", _create_keyset_indexes),
+    Migration(6, "create_availability_rollups", _create_availability_rollups),
+    Migration(7, "add_outage_protocol", _add_outage_protocol),
+    Migration(8, "store_epoch_timestamps", _store_epoch_timestamps, uses_router_zone=True),
+    Migration(9, "mark_missing_raw_lines", _mark_missing_raw_lines),
+    Migration(10, "add_router_id", _add_router_id),
+)
+
+
+def apply_migrations(conn: sqlite3.Connection, zone: tzinfo = ZoneInfo(DEFAULT_ROUTER_TIMEZONE)) -> list[int]:
+    """Apply all pending migrations in order and return their versions.
+
+    ``zone`` is the time zone of the router whose naive log times were
+    stored before rows carried a router id.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+        """
+    )
+    applied_versions = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+    applied: list[int] = []
+    for migration in MIGRATIONS:
+        if migration.version in applied_versions:
+            continue
+        conn.execute("BEGIN")
+        try:
+            if migration.uses_router_zone:
+                migration.apply(conn, zone)
+            else:
+                migration.apply(conn)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, datetime.utcnow().isoformat()),
+            )
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        applied.append(migration.version)
+    return applied
@@ -2,10 +2,17 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
 
+# Router id of rows written before several routers could be monitored, and of
+# the single router configured through the FRITZBOX_* settings.
+DEFAULT_ROUTER_ID = "default"
+# Time zone of the router clock unless configured otherwise; the device log
+# writes local time without an offset.
+DEFAULT_ROUTER_TIMEZONE = "Europe/Berlin"
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class StatusEvent:
     id: int
     timestamp: datetime
@@ -13,7 +20,7 @@ class StatusEvent:
     details: Optional[str]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DeviceLogEntryRecord:
     id: int
     timestamp: datetime
@@ -22,9 +29,41 @@ class DeviceLogEntryRecord:
     source: Optional[str]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class OutageRecord:
+    id: int
     start_time: datetime
     end_time: Optional[datetime]
     duration_seconds: Optional[int]
     status: str
+    protocol: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class DeviceLogBoundary:
+    """Newest ingested log second, in router wall-clock time, and the messages already stored for it."""
+
+    timestamp: datetime
+    messages: frozenset[str]
+
+
+@dataclass
+class OutageCheckpoint:
+    """Calculator state after the last processed device log entry."""
+
+    last_entry_id: int
+    last_timestamp: Optional[datetime]
+    open_state: Dict[str, Dict[str, Any]]
+    pending_planned: Dict[str, bool]
+    config_fingerprint: str
+
+
+@dataclass(frozen=True, slots=True)
+class AvailabilityBucketRecord:
+    bucket_start: datetime
+    bucket_end: datetime
+    protocol: str
+    downtime_seconds: int
+    planned_downtime_seconds: int
+    outage_count: int
+    planned_outage_count: int
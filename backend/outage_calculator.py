@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import hashlib
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Sequence
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from .models import DeviceLogEntryRecord
-from .outage_classifier import categorize_log_entry
+from .models import DeviceLogEntryRecord, OutageCheckpoint, OutageRecord
+from .outage_classifier import compile_classifier
 from .outage_config import DEFAULT_OUTAGE_KEYWORDS, OutageKeywords
 
 
@@ -17,6 +19,80 @@ class OutageInterval:
     status: str
     start_log_entry_id: Optional[int]
     end_log_entry_id: Optional[int]
+    protocol: Optional[str] = None
+
+
+def merge_line_outages(records: Iterable[OutageRecord]) -> List[OutageRecord]:
+    """Union overlapping outages (e.g. ipv4 and ipv6 of one drop) into line outages.
+
+    ``records`` must be ordered by start time, as ``OutageRepository.list_outages``
+    returns them; a single sweep then merges each record into the current
+    window while it starts before that window ends. Open outages never end.
+    """
+    merged: List[OutageRecord] = []
+    first: Optional[OutageRecord] = None
+    statuses: List[str] = []
+    protocols: List[str] = []
+    window_end: Optional[datetime] = None
+    window_open = False
+
+    def _flush() -> None:
+        if first is None:
+            return
+        protocol = "+".join(sorted(set(protocols))) or None
+        all_planned = all(status.startswith("planned") for status in statuses)
+        if window_open:
+            end_time, duration_seconds = None, None
+            status = "planned-open" if all_planned else "open"
+        else:
+            end_time = window_end
+            duration = end_time - first.start_time  # type: ignore[operator]
+            duration_seconds = max(1, int(duration.total_seconds()))
+            if len(set(statuses)) == 1:
+                status = statuses[0]
+            else:
+                status = "planned" if all_planned else "closed"
+        merged.append(
+            OutageRecord(
+                id=first.id,
+                start_time=first.start_time,
+                end_time=end_time,
+                duration_seconds=duration_seconds,
+                status=status,
+                protocol=protocol,
+            )
+        )
+
+    for record in records:
+        overlaps = first is not None and (
+            window_open or (window_end is not None and record.start_time <= window_end)
+        )
+        if not overlaps:
+            _flush()
+            first = record
+            statuses = []
+            protocols = []
+            window_end = None
+            window_open = False
+
+        statuses.append(record.status)
+        if record.protocol:
+            protocols.append(record.protocol)
+        if record.end_time is None:
+            window_open = True
+        elif window_end is None or record.end_time > window_end:
+            window_end = record.end_time
+
+    _flush()
+    return merged
+
+
+# Entries classified per ``categorize_many`` call during a streamed calculation.
+_CLASSIFY_CHUNK_SIZE = 1000
+
+
+def _empty_state() -> Dict[str, Any]:
+    return {"start": None, "start_entry_id": None, "planned": False}
 
 
 class OutageCalculator:
@@ -24,18 +100,59 @@ class OutageCalculator:
 
     def __init__(self, cfg: OutageKeywords = DEFAULT_OUTAGE_KEYWORDS) -> None:
         self._cfg = cfg
+        self._classifier = compile_classifier(cfg)
+        self._fingerprint = hashlib.sha256(repr(cfg).encode("utf-8")).hexdigest()
+
+    @property
+    def config_fingerprint(self) -> str:
+        """Identifies the keyword configuration a checkpoint was built with."""
+        return self._fingerprint
+
+    def _classified(
+        self, entries: Iterable[DeviceLogEntryRecord]
+    ) -> Iterator[Tuple[DeviceLogEntryRecord, Tuple[str, str]]]:
+        # Bulk classification per chunk keeps a lazy ``entries`` stream from
+        # being materialised as a whole.
+        iterator = iter(entries)
+        while True:
+            chunk = list(islice(iterator, _CLASSIFY_CHUNK_SIZE))
+            if not chunk:
+                return
+            yield from zip(chunk, self._classifier.categorize_many(chunk))
+
+    def calculate(self, entries: Iterable[DeviceLogEntryRecord]) -> List[Dict[str, Any]]:
+        outages, _ = self.calculate_incremental(entries, None)
+        return outages
 
-    def calculate(self, entries: Sequence[DeviceLogEntryRecord]) -> List[Dict[str, Any]]:
+    def calculate_incremental(
+        self,
+        entries: Iterable[DeviceLogEntryRecord],
+        checkpoint: Optional[OutageCheckpoint],
+    ) -> Tuple[List[Dict[str, Any]], OutageCheckpoint]:
+        """Continue the calculation from ``checkpoint`` over ``entries``.
+
+        Returns the outages closed within ``entries`` plus all still-open
+        outages, together with the checkpoint to resume from next time.
+        Without a checkpoint this is a full calculation. ``entries`` is
+        consumed in a single pass and may be a lazy iterator.
+        """
         outages: List[Dict[str, Any]] = []
 
-        state: Dict[str, Dict[str, Any]] = {
-            "ipv4": {"start": None, "start_entry_id": None, "planned": False},
-            "ipv6": {"start": None, "start_entry_id": None, "planned": False},
-        }
-        pending_planned = {"ipv4": False, "ipv6": False}
-
-        for entry in entries:
-            protocol, action = categorize_log_entry(entry, self._cfg)
+        if checkpoint is not None:
+            state = {protocol: dict(current) for protocol, current in checkpoint.open_state.items()}
+            pending_planned = dict(checkpoint.pending_planned)
+            last_entry_id = checkpoint.last_entry_id
+            last_timestamp = checkpoint.last_timestamp
+        else:
+            state = {"ipv4": _empty_state(), "ipv6": _empty_state()}
+            pending_planned = {"ipv4": False, "ipv6": False}
+            last_entry_id = 0
+            last_timestamp = None
+
+        for entry, (protocol, action) in self._classified(entries):
+            last_entry_id = max(last_entry_id, entry.id)
+            if last_timestamp is None or entry.timestamp > last_timestamp:
+                last_timestamp = entry.timestamp
 
             if action == "planned_hint":
                 if protocol in ("ipv4", "both"):
@@ -75,10 +192,11 @@ class OutageCalculator:
                         "status": "planned" if current["planned"] else "closed",
                         "start_log_entry_id": current["start_entry_id"],
                         "end_log_entry_id": entry.id,
+                        "protocol": protocol,
                     }
                 )
 
-                state[protocol] = {"start": None, "start_entry_id": None, "planned": False}
+                state[protocol] = _empty_state()
                 pending_planned[protocol] = False
 
         for protocol, current in state.items():
@@ -91,7 +209,15 @@ class OutageCalculator:
                         "status": "planned-open" if current["planned"] else "open",
                         "start_log_entry_id": current["start_entry_id"],
                         "end_log_entry_id": None,
+                        "protocol": protocol,
                     }
                 )
 
-        return outages
+        next_checkpoint = OutageCheckpoint(
+            last_entry_id=last_entry_id,
+            last_timestamp=last_timestamp,
+            open_state=state,
+            pending_planned=pending_planned,
+            config_fingerprint=self._fingerprint,
+        )
+        return outages, next_checkpoint
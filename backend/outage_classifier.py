@@ -1,32 +1,118 @@
 from __future__ import annotations
 
-from typing import Tuple
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from .models import DeviceLogEntryRecord
 from .outage_config import OutageKeywords
 
+# Checked in this order; the first category with a matching keyword wins.
+_CATEGORIES: Tuple[Tuple[str, str, str], ...] = (
+    ("planned_keywords", "both", "planned_hint"),
+    ("ipv6_disconnect_keywords", "ipv6", "disconnect"),
+    ("ipv6_connect_keywords", "ipv6", "connect"),
+    ("ipv4_disconnect_keywords", "ipv4", "disconnect"),
+    ("ipv4_connect_keywords", "ipv4", "connect"),
+)
+_UNKNOWN = ("unknown", "ignore")
 
-def _contains_any(message: str, keywords: tuple[str, ...]) -> bool:
-    return any(keyword in message for keyword in keywords)
 
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Build a regex alternation shaped like a prefix trie of ``keywords``.
 
-def categorize_log_entry(
-    entry: DeviceLogEntryRecord,
-    cfg: OutageKeywords,
-) -> Tuple[str, str]:
-    message = (entry.message or "").lower()
+    ``re`` tries alternatives one after another; factoring out shared prefixes
+    keeps the work per position proportional to the keyword length instead of
+    the number of keywords.
+    """
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
 
-    if _contains_any(message, cfg.planned_keywords):
-        return "both", "planned_hint"
+    def _render(node: Dict[str, dict]) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + _render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        alternation = "|".join(branches)
+        # A keyword ending here makes the remaining branches optional; the
+        # shortest match is enough to know the keyword occurs.
+        if terminal:
+            return f"(?:{alternation})?"
+        return alternation if len(branches) == 1 else f"(?:{alternation})"
 
-    if _contains_any(message, cfg.ipv6_disconnect_keywords):
-        return "ipv6", "disconnect"
-    if _contains_any(message, cfg.ipv6_connect_keywords):
-        return "ipv6", "connect"
+    return _render(trie)
 
-    if _contains_any(message, cfg.ipv4_disconnect_keywords):
-        return "ipv4", "disconnect"
-    if _contains_any(message, cfg.ipv4_connect_keywords):
-        return "ipv4", "connect"
 
-    return "unknown", "ignore"
+class OutageClassifier:
+    """Classifies log messages against precompiled keyword patterns.
+
+    One combined pattern rejects the vast majority of lines (no keyword at all)
+    in a single scan; only matching lines are checked per category in priority
+    order.
+    """
+
+    def __init__(self, cfg: OutageKeywords) -> None:
+        self._categories: List[Tuple[re.Pattern[str], Tuple[str, str]]] = []
+        all_keywords: List[str] = []
+        for field, protocol, action in _CATEGORIES:
+            keywords = getattr(cfg, field)
+            if not keywords:
+                continue
+            self._categories.append((re.compile(_trie_pattern(keywords)), (protocol, action)))
+            all_keywords.extend(keywords)
+        self._any_keyword: Optional[re.Pattern[str]] = (
+            re.compile(_trie_pattern(all_keywords)) if all_keywords else None
+        )
+
+    def categorize(self, message: Optional[str]) -> Tuple[str, str]:
+        if self._any_keyword is None:
+            return _UNKNOWN
+        lowered = (message or "").lower()
+        if self._any_keyword.search(lowered) is None:
+            return _UNKNOWN
+        return self._match_categories(lowered)
+
+    def categorize_many(self, entries: Iterable[DeviceLogEntryRecord]) -> List[Tuple[str, str]]:
+        """Classify ``entries`` in order; one ``(protocol, action)`` per entry.
+
+        The lowered messages are joined into one newline-separated text and
+        scanned once with the combined pattern; only lines it hits are checked
+        per category. Keywords never contain a newline, so no hit spans lines.
+        """
+        lines = [(entry.message or "").lower() for entry in entries]
+        results = [_UNKNOWN] * len(lines)
+        if self._any_keyword is None or not lines:
+            return results
+        text = "\n".join(lines)
+        starts = list(accumulate((len(line) + 1 for line in lines[:-1]), initial=0))
+        search = self._any_keyword.search
+        match = search(text)
+        while match is not None:
+            index = bisect_right(starts, match.start()) - 1
+            results[index] = self._match_categories(lines[index])
+            if index + 1 == len(lines):
+                break
+            match = search(text, starts[index + 1])
+        return results
+
+    def _match_categories(self, lowered: str) -> Tuple[str, str]:
+        for pattern, result in self._categories:
+            if pattern.search(lowered) is not None:
+                return result
+        return _UNKNOWN
+
+
+@lru_cache(maxsize=8)
+def compile_classifier(cfg: OutageKeywords) -> OutageClassifier:
+    return OutageClassifier(cfg)
+
+
+def categorize_log_entry(entry: DeviceLogEntryRecord, cfg: OutageKeywords) -> Tuple[str, str]:
+    return compile_classifier(cfg).categorize(entry.message)
+
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Optional
+
+from .database import ExportRepository, RetentionRepository
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionJob:
+    """Archives expired status events and log entries, then shrinks the database.
+
+    Expired rows are appended as NDJSON to gzip files per table and month
+    (``<table>-YYYY-MM.ndjson.gz``) before they are deleted, so archiving is
+    at-least-once: a crash between both steps can repeat lines in an archive.
+    Outages are never removed; calculated outages whose log entries were
+    archived stay as they are.
+    """
+
+    def __init__(
+        self,
+        retention_repository: RetentionRepository,
+        archive_directory: Path,
+        retention_days: Dict[str, int],
+        batch_size: int = 5000,
+    ) -> None:
+        self._repository = retention_repository
+        self._archive_directory = archive_directory
+        # 0 keeps a table forever.
+        self._retention_days = {table: days for table, days in retention_days.items() if days > 0}
+        self._batch_size = batch_size
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any table has a retention period."""
+        return bool(self._retention_days)
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Archive and delete expired rows; return the archived count per table."""
+        now = now or datetime.now(timezone.utc)
+        archived: Dict[str, int] = {}
+        for table, days in self._retention_days.items():
+            cutoff = now - timedelta(days=days)
+            archived[table] = sum(
+                self._archive_rows(table, router_id, cutoff) for router_id in self._repository.router_ids(table)
+            )
+        compacted = self._repository.compact_raw_lines()
+        self._repository.reclaim_space()
+        if any(archived.values()) or compacted:
+            logger.info("retention: archived %s, compacted %d raw log lines", archived, compacted)
+        return archived
+
+    def _archive_rows(self, table: str, router_id: str, cutoff: datetime) -> int:
+        columns = ExportRepository.TABLE_COLUMNS[table]
+        time_index = columns.index(self._repository.TIME_COLUMNS[table])
+        total = 0
+        while True:
+            rows = self._repository.expired_rows(table, router_id, cutoff, self._batch_size)
+            if not rows:
+                return total
+            self._archive_directory.mkdir(parents=True, exist_ok=True)
+            # Exported times are ISO 8601, so the first seven characters are the month.
+            for month, month_rows in groupby(rows, key=lambda row: row[time_index][:7]):
+                path = self._archive_directory / f"{table}-{month}.ndjson.gz"
+                with gzip.open(path, "at", encoding="utf-8") as archive:
+                    for row in month_rows:
+                        archive.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                        archive.write("\n")
+            self._repository.delete_rows(table, (row[0] for row in rows))
+            total += len(rows)
+            if len(rows) < self._batch_size:
+                return total
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Optional
+
+from .config import RouterConfig
+from .database import AvailabilityRepository, DeviceLogRepository, OutageRepository, StatusRepository
+from .device_log_sync import DeviceLogSync
+from .tracker import ConnectionTracker
+
+
+@dataclass(frozen=True)
+class RouterMonitor:
+    """Everything that polls and stores the data of one router."""
+
+    config: RouterConfig
+    status_repository: StatusRepository
+    device_log_repository: DeviceLogRepository
+    outage_repository: OutageRepository
+    availability_repository: AvailabilityRepository
+    device_log_sync: DeviceLogSync
+    tracker: ConnectionTracker
+
+    @property
+    def router_id(self) -> str:
+        return self.config.router_id
+
+
+class RouterRegistry:
+    """The monitored routers, in configuration order; the first one is the default."""
+
+    def __init__(self, monitors: Iterable[RouterMonitor]) -> None:
+        self._monitors: Dict[str, RouterMonitor] = {monitor.router_id: monitor for monitor in monitors}
+        if not self._monitors:
+            raise ValueError("at least one router is required")
+        self._default = next(iter(self._monitors.values()))
+
+    def __iter__(self) -> Iterator[RouterMonitor]:
+        return iter(self._monitors.values())
+
+    def __len__(self) -> int:
+        return len(self._monitors)
+
+    def get(self, router_id: Optional[str] = None) -> RouterMonitor:
+        """Return the monitor of ``router_id`` (default router if None); raise ``KeyError`` if unknown."""
+        if router_id is None:
+            return self._default
+        return self._monitors[router_id]
+
+    async def start(self) -> None:
+        await asyncio.gather(*(monitor.tracker.start() for monitor in self))
+
+    async def stop(self) -> None:
+        await asyncio.gather(*(monitor.tracker.stop() for monitor in self))
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledJob:
+    """A blocking callable run by ``Scheduler`` at a fixed rate, with its run statistics."""
+
+    def __init__(
+        self,
+        name: str,
+        interval_seconds: float,
+        work: Callable[[], None],
+        on_error: Optional[Callable[[Exception], None]],
+        timeout_seconds: Optional[float],
+    ) -> None:
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.work = work
+        self.on_error = on_error
+        self.timeout_seconds = timeout_seconds
+        # Statistics, written on the event loop only
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.skipped_busy = 0
+        self.skipped_backoff = 0
+        self.consecutive_failures = 0
+        self.last_duration_seconds: Optional[float] = None
+        # Scheduling state
+        self._ticker: Optional[asyncio.Task[None]] = None
+        self._execution: Optional[asyncio.Task[None]] = None
+        self._backoff_ticks = 0
+        self._rescheduled = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._execution is not None and not self._execution.done()
+
+
+class Scheduler:
+    """Runs blocking jobs at fixed rates on a dedicated, bounded thread pool.
+
+    Ticks follow a fixed grid (start + n * interval) so runs do not drift by
+    their own duration; each tick is delayed by a random jitter of up to
+    ``jitter_seconds`` so many jobs with the same interval do not fire at
+    once. A tick is skipped while the job's previous run is still going, so a
+    slow or hung call occupies at most one worker. A run exceeding its timeout
+    counts as failed; its thread cannot be interrupted and keeps the job busy
+    until it returns. After consecutive failures a job skips 1, 3, 7, ... ticks
+    (exponential backoff, capped at ``max_backoff_seconds``) before retrying.
+
+    Error handlers run on a separate pool, so they still run when every
+    worker is held by a hung call. The pools are created by ``start`` and
+    released by ``stop``, which also cancels all jobs; a stopped scheduler
+    can be given new jobs and started again.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        *,
+        jitter_seconds: float = 0.0,
+        default_timeout_seconds: Optional[float] = None,
+        max_backoff_seconds: float = 900.0,
+    ) -> None:
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._error_executor: Optional[ThreadPoolExecutor] = None
+        self._jitter = jitter_seconds
+        self._default_timeout = default_timeout_seconds
+        self._max_backoff = max_backoff_seconds
+        self._jobs: Set[ScheduledJob] = set()
+        self._started = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def jobs(self) -> List[ScheduledJob]:
+        return sorted(self._jobs, key=lambda job: job.name)
+
+    def schedule(
+        self,
+        name: str,
+        interval_seconds: float,
+        work: Callable[[], None],
+        on_error: Optional[Callable[[Exception], None]] = None,
+        timeout_seconds: Optional[float] = None,
+    ) -> ScheduledJob:
+        """Add a job; it first runs right away (plus jitter) once the scheduler is started."""
+        job = ScheduledJob(
+            name,
+            interval_seconds,
+            work,
+            on_error,
+            timeout_seconds if timeout_seconds is not None else self._default_timeout,
+        )
+        self._jobs.add(job)
+        if self._started:
+            job._ticker = asyncio.create_task(self._tick(job))
+        return job
+
+    def set_interval(self, job: ScheduledJob, interval_seconds: float) -> None:
+        """Change the interval of ``job``; safe to call from any thread.
+
+        A shorter interval starts a new grid right away, so a sped-up job runs
+        now instead of at its next slow tick; a longer one applies from the
+        next tick on.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            job.interval_seconds = interval_seconds
+            return
+        loop.call_soon_threadsafe(self._apply_interval, job, interval_seconds)
+
+    def _apply_interval(self, job: ScheduledJob, interval_seconds: float) -> None:
+        sooner = interval_seconds < job.interval_seconds
+        job.interval_seconds = interval_seconds
+        if sooner:
+            job._rescheduled.set()
+
+    async def cancel(self, job: ScheduledJob) -> None:
+        """Stop scheduling ``job`` and wait for a run in progress."""
+        self._jobs.discard(job)
+        ticker, job._ticker = job._ticker, None
+        if ticker is not None:
+            ticker.cancel()
+            await asyncio.gather(ticker, return_exceptions=True)
+        if job._execution is not None:
+            # A hung run cannot be interrupted; do not wait longer than its timeout.
+            await asyncio.wait({job._execution}, timeout=job.timeout_seconds)
+
+    async def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="scheduler")
+        self._error_executor = ThreadPoolExecutor(
+            max_workers=self._max_workers, thread_name_prefix="scheduler-errors"
+        )
+        for job in self._jobs:
+            job._ticker = asyncio.create_task(self._tick(job))
+
+    async def stop(self) -> None:
+        """Cancel all jobs, wait for runs in progress and release the worker threads."""
+        for job in list(self._jobs):
+            await self.cancel(job)
+        self._started = False
+        self._loop = None
+        for executor in (self._executor, self._error_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._executor = self._error_executor = None
+
+    async def _tick(self, job: ScheduledJob) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            delay = next_tick - loop.time() + random.uniform(0.0, self._jitter)
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(job._rescheduled.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            if job._rescheduled.is_set():
+                job._rescheduled.clear()
+                next_tick = loop.time()
+
+            if job.running:
+                job.skipped_busy += 1
+            elif job._backoff_ticks > 0:
+                job._backoff_ticks -= 1
+                job.skipped_backoff += 1
+            else:
+                job._execution = asyncio.create_task(self._execute(job))
+
+            next_tick += job.interval_seconds
+            behind = loop.time() - next_tick
+            if behind > 0:
+                # The loop was blocked for more than an interval; resume on the grid.
+                missed = int(behind // job.interval_seconds) + 1
+                next_tick += missed * job.interval_seconds
+                job.skipped_busy += missed
+
+    async def _execute(self, job: ScheduledJob) -> None:
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        future = loop.run_in_executor(self._executor, job.work)
+        error: Optional[Exception] = None
+        try:
+            await asyncio.wait_for(asyncio.shield(future), job.timeout_seconds)
+        except asyncio.TimeoutError:
+            job.timeouts += 1
+            error = TimeoutError(f"{job.name} did not finish within {job.timeout_seconds:g}s")
+        except Exception as exc:  # noqa: BLE001
+            error = exc
+
+        job.runs += 1
+        if error is None:
+            job.consecutive_failures = 0
+        else:
+            job.failures += 1
+            job.consecutive_failures += 1
+            max_ticks = max(1, int(self._max_backoff // job.interval_seconds))
+            job._backoff_ticks = min(2 ** (job.consecutive_failures - 1), max_ticks) - 1
+            if job.on_error is not None:
+                try:
+                    await loop.run_in_executor(self._error_executor, job.on_error, error)
+                except Exception:  # noqa: BLE001
+                    logger.exception("error handler of %s failed", job.name)
+
+        # A timed-out run still holds its worker; the job stays busy until it returns.
+        await asyncio.gather(future, return_exceptions=True)
+        job.last_duration_seconds = time.monotonic() - started
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
+from enum import Enum
 from typing import Any, Dict, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
@@ -28,6 +29,10 @@ class DeviceLogResponse(BaseModel):
     entries: List[DeviceLogEntry] = Field(
         description="Zeilen aus dem Fritzbox-Ereignisprotokoll"
     )
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Cursor für die nächste Seite in derselben Richtung; None wenn keine weiteren Einträge",
+    )
 
 
 class OutageWindow(BaseModel):
@@ -42,10 +47,18 @@ class OutageWindow(BaseModel):
     status: Optional[str] = Field(
         default=None, description="open|closed je nach aktuellem Zustand"
     )
+    protocol: Optional[str] = Field(
+        default=None,
+        description="ipv4|ipv6; zusammengefasste Leitungsstörungen z. B. ipv4+ipv6",
+    )
 
 
 class OutageListResponse(BaseModel):
     outages: List[OutageWindow]
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Cursor für die nächste Seite in derselben Richtung; None wenn keine weiteren Störungen",
+    )
 
 
 class OutageCreate(BaseModel):
@@ -59,6 +72,16 @@ class OutageCreateResponse(BaseModel):
     outage: OutageWindow
 
 
+class RouterInfo(BaseModel):
+    id: str = Field(description="Router-ID für den Parameter router")
+    name: Optional[str] = Field(default=None, description="Anzeigename")
+    address: str = Field(description="Adresse der Fritzbox")
+
+
+class RouterListResponse(BaseModel):
+    routers: List[RouterInfo] = Field(description="Überwachte Router; der erste ist der Standard")
+
+
 class ConnectivityStatus(BaseModel):
     connected: bool = Field(description="Gibt an, ob laut TR-064 derzeit eine Verbindung besteht")
     external_ip: Optional[str] = Field(default=None, description="Vom Router gemeldete externe IP")
@@ -68,3 +91,41 @@ class ConnectivityStatus(BaseModel):
     uptime: Optional[Union[int, str]] = Field(
         default=None, description="Online-Dauer laut Fritzbox (Sekunden oder formatiert)"
     )
+
+
+class ExportTable(str, Enum):
+    status_events = "status_events"
+    device_log_entries = "device_log_entries"
+    outages = "outages"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class AvailabilityGranularity(str, Enum):
+    hour = "hour"
+    day = "day"
+    month = "month"
+
+
+class AvailabilityBucket(BaseModel):
+    start: datetime = Field(description="Beginn des Zeitraums")
+    end: datetime = Field(description="Ende des Zeitraums (exklusiv)")
+    protocol: str = Field(description="ipv4|ipv6|unknown")
+    downtime_seconds: int = Field(description="Störungsdauer im Zeitraum in Sekunden")
+    planned_downtime_seconds: int = Field(description="Davon geplante Störungen (z.B. Zwangstrennung)")
+    unplanned_downtime_seconds: int = Field(description="Davon ungeplante Störungen")
+    outage_count: int = Field(description="Anzahl der im Zeitraum beginnenden Störungen")
+    planned_outage_count: int = Field(description="Davon geplante Störungen")
+    availability_percent: float = Field(description="Verfügbarkeit im Zeitraum in Prozent")
+
+
+class AvailabilityResponse(BaseModel):
+    granularity: AvailabilityGranularity
+    start: datetime
+    end: datetime
+    buckets: List[AvailabilityBucket] = Field(
+        description="Zeiträume mit Störungen; fehlende Zeiträume waren zu 100 % verfügbar"
+    )
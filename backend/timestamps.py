@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import math
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Tuple
+
+# Timestamps are stored as integer seconds since the epoch (UTC) plus the UTC
+# offset of the source value in seconds. The router logs naive local time;
+# such values are localized with the router's configured time zone before
+# they are stored, so every row is a real instant, and the router's wall-clock
+# time is the epoch plus the stored offset.
+
+
+def localize(moment: datetime, zone: tzinfo) -> datetime:
+    """Read a naive ``moment`` as wall-clock time in ``zone``; aware values are returned as they are.
+
+    The result carries the fixed UTC offset in effect at ``moment``, so
+    differences between localized values are real durations across DST
+    changes. Wall times that a DST change skips or repeats resolve to the
+    offset in effect before the change (``fold=0``).
+    """
+    if moment.tzinfo is not None:
+        return moment
+    offset = moment.replace(tzinfo=zone).utcoffset()
+    return moment.replace(tzinfo=timezone(offset))  # type: ignore[arg-type]
+
+
+def to_wall_clock(moment: datetime, zone: tzinfo) -> datetime:
+    """Naive wall-clock time of ``moment`` in ``zone``; naive values already are."""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(zone).replace(tzinfo=None)
+
+
+def to_epoch(moment: datetime) -> Tuple[int, int]:
+    """Return the epoch seconds of the aware ``moment`` and its UTC offset in seconds."""
+    return math.floor(_seconds(moment)), int(moment.utcoffset().total_seconds())  # type: ignore[union-attr]
+
+
+def from_epoch(epoch: int, offset: int) -> datetime:
+    """Inverse of ``to_epoch``: the instant at the stored UTC offset."""
+    return datetime.fromtimestamp(epoch, timezone(timedelta(seconds=offset)))
+
+
+def epoch_floor(moment: datetime) -> int:
+    """Last whole second at or before the aware ``moment``, for inclusive upper bounds."""
+    return math.floor(_seconds(moment))
+
+
+def epoch_ceil(moment: datetime) -> int:
+    """First whole second at or after the aware ``moment``, for inclusive lower bounds."""
+    return math.ceil(_seconds(moment))
+
+
+def utc_now_epoch() -> int:
+    return int(datetime.now(timezone.utc).timestamp())
+
+
+def _seconds(moment: datetime) -> float:
+    # A naive value would silently be read in the process time zone.
+    if moment.utcoffset() is None:
+        raise ValueError(f"naive datetime {moment.isoformat()} has no UTC offset; localize it first")
+    return moment.timestamp()
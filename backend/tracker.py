@@ -1,93 +1,253 @@
 from __future__ import annotations
 
-import asyncio
 import json
+import threading
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 from .database import StatusRepository
 from .device_log_sync import DeviceLogSync
+from .event_hub import EventHub
 from .fritzbox_client import FritzboxClient
-from .periodic_runner import PeriodicRunner
+from .metrics import POLL_ERRORS, ROUTER_REQUEST_SECONDS
+from .models import DEFAULT_ROUTER_ID
+from .scheduler import ScheduledJob, Scheduler
 
 
 class ConnectionTracker:
-    """Coordinates TR-064 status polls and persistence."""
+    """Coordinates TR-064 status polls and persistence for one router.
+
+    With a ``fast_poll_interval_seconds`` both polls switch to that interval
+    as soon as the router reports offline, a poll fails or the device log
+    opens an outage, so outage boundaries are measured closely. Once the
+    connection has been online for ``stable_period_seconds`` the interval
+    doubles with every poll until it is back at the configured one.
+    """
 
     def __init__(
         self,
         status_repository: StatusRepository,
         fritzbox_client: FritzboxClient,
         device_log_sync: DeviceLogSync,
+        scheduler: Scheduler,
         poll_interval_seconds: int,
         device_log_poll_interval_seconds: int,
+        status_max_age_seconds: float = 0.0,
+        event_hub: Optional[EventHub] = None,
+        router_id: str = DEFAULT_ROUTER_ID,
+        fast_poll_interval_seconds: float = 0.0,
+        stable_period_seconds: float = 300.0,
     ) -> None:
         # Persistence & domain collaborators
+        self._router_id = router_id
         self._status_repository = status_repository
         self._fritzbox_client = fritzbox_client
         self._device_log_sync = device_log_sync
-        self._status_poller = PeriodicRunner(
-            interval_seconds=poll_interval_seconds,
-            work=self.poll_now,
-            on_error=self._handle_poll_error,
-        )
-        self._device_log_poller = PeriodicRunner(
-            interval_seconds=device_log_poll_interval_seconds,
-            work=self._device_log_sync.run_once,
-            on_error=self._handle_device_log_error,
-        )
+        self._event_hub = event_hub
+        # Last persisted status, so polls only touch the database on transitions
+        self._status_lock = threading.Lock()
+        self._last_status: Optional[str] = None
+        self._last_status_loaded = False
+        # Single-flight router polls: concurrent callers share one TR-064 call
+        self._status_max_age = status_max_age_seconds
+        self._router_poll_lock = threading.Lock()
+        self._router_poll_finished_at: Optional[float] = None
+        self._router_poll_timestamp: Optional[datetime] = None
+        self._router_poll_result: Optional[Dict[str, Any]] = None
+        self._router_poll_error: Optional[Exception] = None
+        self._poll_seconds = ROUTER_REQUEST_SECONDS.labels(router_id, "GetStatus")
+        # Background polls run as jobs of the shared scheduler while started
+        self._scheduler = scheduler
+        self._poll_interval = poll_interval_seconds
+        self._device_log_poll_interval = device_log_poll_interval_seconds
+        self._jobs: List[ScheduledJob] = []
+        # Adaptive polling: 0 keeps the configured intervals
+        self._fast_poll_interval = min(fast_poll_interval_seconds, poll_interval_seconds)
+        self._stable_period = stable_period_seconds
+        self._interval_lock = threading.Lock()
+        self._current_interval: float = poll_interval_seconds
+        self._unstable_since: Optional[float] = None
 
-    def poll_now(self) -> Dict[str, Any]:
-        status = self._fritzbox_client.poll_status()
+    def poll_now(self, max_age_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Return the router status, polling unless a result younger than
+        ``max_age_seconds`` (default: the configured max age) is available."""
+        status, timestamp = self._poll_router(max_age_seconds)
         connection_is_up = bool(status.get("connected"))
         details = status.get("details", {})
-        timestamp = datetime.now(timezone.utc)
         status_value = "online" if connection_is_up else "offline"
 
-        latest = self._status_repository.latest_event()
-        if latest is None or latest.status != status_value:
-            self._status_repository.record_event(
-                status=status_value,
-                timestamp=timestamp,
-                details=json.dumps(details, default=str),
-            )
+        with self._status_lock:
+            self._load_last_status()
+            if self._last_status != status_value:
+                self._record_status(status_value, timestamp, json.dumps(details, default=str), details)
 
+        if connection_is_up:
+            self._note_stable()
+        else:
+            self._note_unstable()
         return {
             "timestamp": timestamp.isoformat(),
             "status": status_value,
             "details": details,
         }
 
-    def check_connection(self) -> Dict[str, Any]:
-        status = self._fritzbox_client.poll_status()
+    def check_connection(self, max_age_seconds: Optional[float] = None) -> Dict[str, Any]:
+        status, _ = self._poll_router(max_age_seconds)
         details = status.get("details", {})
         return {
             "connected": bool(status.get("connected")),
             **details,
         }
 
+    @property
+    def last_status(self) -> Optional[str]:
+        """The last persisted status (online, offline or error), if known."""
+        return self._last_status
+
+    @property
+    def poll_interval_seconds(self) -> float:
+        """The status poll interval currently in effect."""
+        return self._current_interval
+
+    def _scheduled_poll(self) -> None:
+        self.poll_now(max_age_seconds=0)
+
+    def _scheduled_device_log_sync(self) -> None:
+        was_open = self._device_log_sync.outage_open
+        self._device_log_sync.run_once()
+        if self._device_log_sync.outage_open and not was_open:
+            self._note_unstable()
+
+    def _note_unstable(self) -> None:
+        if self._fast_poll_interval <= 0:
+            return
+        with self._interval_lock:
+            self._unstable_since = time.monotonic()
+            if self._current_interval != self._fast_poll_interval:
+                self._set_interval(self._fast_poll_interval)
+
+    def _note_stable(self) -> None:
+        if self._fast_poll_interval <= 0:
+            return
+        with self._interval_lock:
+            if self._current_interval >= self._poll_interval:
+                return
+            if self._unstable_since is not None and time.monotonic() - self._unstable_since < self._stable_period:
+                return
+            self._set_interval(min(self._current_interval * 2, self._poll_interval))
+
+    def _set_interval(self, interval: float) -> None:
+        # Caller must hold ``_interval_lock``.
+        self._current_interval = interval
+        if self._jobs:
+            status_job, device_log_job = self._jobs
+            self._scheduler.set_interval(status_job, interval)
+            self._scheduler.set_interval(device_log_job, self._device_log_interval(interval))
+
+    def _device_log_interval(self, status_interval: float) -> float:
+        if status_interval >= self._poll_interval:
+            return self._device_log_poll_interval
+        return min(status_interval, self._device_log_poll_interval)
+
+    def _poll_router(self, max_age_seconds: Optional[float]) -> Tuple[Dict[str, Any], datetime]:
+        max_age = self._status_max_age if max_age_seconds is None else max_age_seconds
+        requested_at = time.monotonic()
+        with self._router_poll_lock:
+            finished_at = self._router_poll_finished_at
+            if finished_at is not None:
+                # A poll that completed while we waited for the lock is shared,
+                # including its error; otherwise honour the max age.
+                shared = finished_at >= requested_at
+                if shared or (self._router_poll_error is None and requested_at - finished_at <= max_age):
+                    if self._router_poll_error is not None:
+                        raise self._router_poll_error
+                    return self._router_poll_result, self._router_poll_timestamp  # type: ignore[return-value]
+
+            try:
+                with self._poll_seconds.time():
+                    result = self._fritzbox_client.poll_status()
+            except Exception as exc:
+                self._router_poll_error = exc
+                raise
+            else:
+                self._router_poll_error = None
+                self._router_poll_result = result
+                self._router_poll_timestamp = datetime.now(timezone.utc)
+                return result, self._router_poll_timestamp
+            finally:
+                self._router_poll_finished_at = time.monotonic()
+
     async def start(self) -> None:
-        await self._status_poller.start()
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, self._device_log_sync.run_once)
-        await self._device_log_poller.start()
+        if self._jobs:
+            return
+        with self._status_lock:
+            self._load_last_status()
+        self._jobs = [
+            self._scheduler.schedule(
+                f"status_poll:{self._router_id}",
+                self._current_interval,
+                self._scheduled_poll,
+                on_error=self._handle_poll_error,
+            ),
+            self._scheduler.schedule(
+                f"device_log_sync:{self._router_id}",
+                self._device_log_interval(self._current_interval),
+                self._scheduled_device_log_sync,
+                on_error=self._handle_device_log_error,
+            ),
+        ]
 
     async def stop(self) -> None:
-        await self._status_poller.stop()
-        await self._device_log_poller.stop()
+        jobs, self._jobs = self._jobs, []
+        for job in jobs:
+            await self._scheduler.cancel(job)
 
-    def _handle_poll_error(self, exc: Exception) -> None:
-        error_timestamp = datetime.now(timezone.utc)
+    def _load_last_status(self) -> None:
+        # Caller must hold ``_status_lock``.
+        if self._last_status_loaded:
+            return
+        latest = self._status_repository.latest_event()
+        self._last_status = latest.status if latest is not None else None
+        self._last_status_loaded = True
+
+    def _record_status(
+        self,
+        status: str,
+        timestamp: datetime,
+        details: Optional[str],
+        event_details: Dict[str, Any],
+    ) -> None:
+        # Caller must hold ``_status_lock``; the cache follows only successful writes.
         self._status_repository.record_event(
-            status="error",
-            timestamp=error_timestamp,
-            details=str(exc),
+            status=status,
+            timestamp=timestamp,
+            details=details,
         )
+        self._last_status = status
+        self._last_status_loaded = True
+        if self._event_hub is not None:
+            self._event_hub.publish(
+                "status",
+                {
+                    "router_id": self._router_id,
+                    "timestamp": timestamp.isoformat(),
+                    "status": status,
+                    "details": event_details,
+                },
+            )
+
+    def _handle_poll_error(self, exc: Exception) -> None:
+        POLL_ERRORS.labels(self._router_id, "status_poll").inc()
+        error_timestamp = datetime.now(timezone.utc)
+        message = str(exc)
+        with self._status_lock:
+            self._record_status("error", error_timestamp, message, {"error": message})
+        self._note_unstable()
 
     def _handle_device_log_error(self, exc: Exception) -> None:
+        POLL_ERRORS.labels(self._router_id, "device_log_sync").inc()
         error_timestamp = datetime.now(timezone.utc)
-        self._status_repository.record_event(
-            status="error",
-            timestamp=error_timestamp,
-            details=f"device_log_poll: {exc}",
-        )
+        message = f"device_log_poll: {exc}"
+        with self._status_lock:
+            self._record_status("error", error_timestamp, message, {"error": message})
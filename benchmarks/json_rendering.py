@@ -0,0 +1,114 @@
+"""Rendering time of the /outages and /device-log list bodies.
+
+Compares the Pydantic path (decode rows to records, build response models,
+serialise) with the rows SQLite renders via ``json_object``, on a temporary
+database with synthetic data::
+
+    python -m benchmarks.json_rendering --rows 20000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+from backend.database import DatabaseContext, DeviceLogRepository, OutageRepository
+from backend.schemas import DeviceLogEntry, DeviceLogResponse, OutageListResponse, OutageWindow
+
+
+def _fill(device_log_repository: DeviceLogRepository, outage_repository: OutageRepository, rows: int) -> None:
+    rng = random.Random(0)
+    moment = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    outages = []
+    entries = []
+    for index in range(rows):
+        moment += timedelta(minutes=rng.randint(10, 300))
+        end = moment + timedelta(seconds=rng.randint(1, 900)) if index % 97 else None
+        outages.append(
+            {
+                "start_time": moment,
+                "end_time": end,
+                "duration_seconds": int((end - moment).total_seconds()) if end else None,
+                "status": "closed" if end else "open",
+                "start_log_entry_id": index,
+                "protocol": rng.choice(["ipv4", "ipv6"]),
+            }
+        )
+        entries.append({"timestamp": moment.isoformat(), "message": f"Störung {index}", "raw": f'raw "{index}"'})
+    outage_repository.replace_outages(outages)
+    device_log_repository.ingest_entries(entries)
+
+
+def _measure(render: Callable[[], bytes], repeat: int) -> float:
+    render()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000, help="number of outages and log lines")
+    parser.add_argument("--limit", type=int, default=None, help="page size; default: all rows")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        context = DatabaseContext(Path(directory) / "benchmark.db")
+        context.init_schema()
+        device_log_repository = DeviceLogRepository(context)
+        outage_repository = OutageRepository(context)
+        _fill(device_log_repository, outage_repository, args.rows)
+
+        def outages_pydantic() -> bytes:
+            records = outage_repository.list_outages(limit=args.limit)
+            windows = [
+                OutageWindow(
+                    start=record.start_time,
+                    end=record.end_time,
+                    duration_seconds=record.duration_seconds,
+                    status=record.status,
+                    protocol=record.protocol,
+                )
+                for record in records
+            ]
+            return OutageListResponse(outages=windows).model_dump_json().encode("utf-8")
+
+        def outages_sql() -> bytes:
+            rows = outage_repository.list_outages_json(limit=args.limit)
+            items = ",".join(row[2] for row in rows)
+            return f'{{"outages":[{items}],"next_cursor":null}}'.encode("utf-8")
+
+        def entries_pydantic() -> bytes:
+            records = device_log_repository.list_entries(limit=args.limit)
+            entries = [
+                DeviceLogEntry(timestamp=record.timestamp, message=record.message, raw=record.raw or record.message)
+                for record in records
+            ]
+            return DeviceLogResponse(entries=entries).model_dump_json().encode("utf-8")
+
+        def entries_sql() -> bytes:
+            rows = device_log_repository.list_entries_json(limit=args.limit)
+            items = ",".join(row[2] for row in rows)
+            return f'{{"entries":[{items}],"next_cursor":null}}'.encode("utf-8")
+
+        for name, pydantic_render, sql_render in (
+            ("outages", outages_pydantic, outages_sql),
+            ("device-log", entries_pydantic, entries_sql),
+        ):
+            if pydantic_render() != sql_render():
+                raise SystemExit(f"{name}: rendered bodies differ")
+            print(
+                f"{name}: pydantic {_measure(pydantic_render, args.repeat):.1f} ms,"
+                f" json_object {_measure(sql_render, args.repeat):.1f} ms"
+            )
+        context.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Peak Python memory and run time of a full outage recompute.
+
+Fills a temporary database with synthetic device log lines (200k by default)
+and measures ``DeviceLogSync.recalculate_all`` with ``tracemalloc``::
+
+    python -m benchmarks.outage_recompute_memory --lines 200000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from backend.database import DatabaseContext, DeviceLogRepository, OutageRepository
+from backend.device_log_sync import DeviceLogSync
+from backend.outage_calculator import OutageCalculator
+
+_MESSAGES = (
+    "Internetverbindung wurde getrennt.",
+    "Internetverbindung wurde erfolgreich hergestellt.",
+    "WLAN-Gerät angemeldet",
+    "DSL ist verfügbar",
+)
+
+
+def _fill(repository: DeviceLogRepository, lines: int) -> None:
+    rng = random.Random(0)
+    moment = datetime(2023, 1, 1)
+    entries = []
+    for index in range(lines):
+        moment += timedelta(seconds=rng.randint(1, 120))
+        message = rng.choice(_MESSAGES)
+        entries.append({"timestamp": moment.isoformat(), "message": f"{message} {index}", "raw": message})
+    repository.ingest_entries(entries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000, help="number of device log lines")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        context = DatabaseContext(Path(directory) / "benchmark.db")
+        context.init_schema()
+        device_log_repository = DeviceLogRepository(context)
+        _fill(device_log_repository, args.lines)
+        # recalculate_all reads only the database; no router client is needed.
+        sync = DeviceLogSync(
+            None, device_log_repository, OutageRepository(context), OutageCalculator()  # type: ignore[arg-type]
+        )
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        sync.recalculate_all()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        context.close()
+
+    print(f"lines: {args.lines}")
+    print(f"peak allocation: {peak / 1_000_000:.1f} MB")
+    print(f"run time: {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
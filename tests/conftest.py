@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+from backend.database import DatabaseContext
+
+
+@pytest.fixture
+def db_context(tmp_path: Path) -> Iterator[DatabaseContext]:
+    context = DatabaseContext(tmp_path / "stoergeler.db")
+    context.init_schema()
+    yield context
+    context.close()
+
+
+@pytest.fixture
+def set_timezone(monkeypatch: pytest.MonkeyPatch) -> Iterator[Callable[[str], None]]:
+    """Switch the process time zone, e.g. ``set_timezone("Europe/Berlin")``."""
+
+    def _set(name: str) -> None:
+        monkeypatch.setenv("TZ", name)
+        time.tzset()
+
+    yield _set
+    monkeypatch.undo()
+    time.tzset()
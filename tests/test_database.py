@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from backend.database import DatabaseContext, DeviceLogRepository
+
+
+def test_entries_after_are_scoped_to_the_router_and_ordered_by_time(db_context: DatabaseContext) -> None:
+    first = DeviceLogRepository(db_context, router_id="first")
+    second = DeviceLogRepository(db_context, router_id="second")
+    first.ingest_entries([{"timestamp": "2024-01-01T10:00:00", "message": "alt"}])
+    second.ingest_entries([{"timestamp": "2024-01-01T10:00:00", "message": "anderer Router"}])
+    # An imported archive line gets a higher id but an older time.
+    first.ingest_entries(
+        [
+            {"timestamp": "2024-01-01T12:00:00", "message": "neu"},
+            {"timestamp": "2023-12-31T08:00:00", "message": "Archiv"},
+        ]
+    )
+
+    entries = first.list_entries_after(1)
+
+    assert [entry.message for entry in entries] == ["Archiv", "neu"]
+    assert [entry.message for entry in second.list_entries_after(0)] == ["anderer Router"]
@@ -0,0 +1,110 @@
+"""The SQL-rendered JSON of /device-log and /outages matches the Pydantic serialisation."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from backend.database import DatabaseContext, DeviceLogRepository, OutageRepository
+from backend.schemas import DeviceLogEntry, OutageWindow
+
+_TIMESTAMPS = [
+    "2024-03-31T01:59:59",
+    "2024-03-31T03:00:00",
+    "2024-10-27T02:30:00",
+    "2024-05-01T10:00:00+00:00",
+    "2024-05-01T10:00:00Z",
+    "2024-05-01T10:00:00+05:30",
+    "2024-05-01T10:00:00-03:30",
+    "2024-05-01T10:00:00-10:00",
+    "1969-12-31T23:59:59",
+]
+
+_MESSAGES = [
+    "Internetverbindung wurde getrennt.",
+    "Störung: DSL-Synchronisierung verloren – Grund: „Leitung“",
+    'Anführungszeichen " und Backslash \\ und Tab \t',
+    "Emoji 📡 und CJK 接続",
+    "Steuerzeichen \x01\x1f",
+]
+
+
+@pytest.fixture
+def device_log_repository(db_context: DatabaseContext) -> DeviceLogRepository:
+    return DeviceLogRepository(db_context)
+
+
+@pytest.fixture
+def outage_repository(db_context: DatabaseContext) -> OutageRepository:
+    return OutageRepository(db_context)
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+def test_device_log_json_matches_pydantic(device_log_repository: DeviceLogRepository, ascending: bool) -> None:
+    entries = [
+        # "+00:00" and "Z" are the same instant; the index keeps those lines distinct.
+        {"timestamp": timestamp, "message": f"{message} #{index}", "raw": raw}
+        for index, timestamp in enumerate(_TIMESTAMPS)
+        for message, raw in [
+            (_MESSAGES[index % len(_MESSAGES)], None),
+            (_MESSAGES[(index + 1) % len(_MESSAGES)], ""),
+            (_MESSAGES[(index + 2) % len(_MESSAGES)], f"{timestamp} Rohzeile ü"),
+        ]
+    ]
+    for entry in entries:
+        if entry["raw"] is None:
+            del entry["raw"]
+    assert device_log_repository.ingest_entries(entries) == len(entries)
+
+    records = device_log_repository.list_entries(ascending=ascending)
+    rows = device_log_repository.list_entries_json(ascending=ascending)
+
+    assert [row[0] for row in rows] == [record.id for record in records]
+    expected = [
+        DeviceLogEntry(timestamp=record.timestamp, message=record.message, raw=record.raw or record.message)
+        .model_dump_json()
+        for record in records
+    ]
+    assert [row[2] for row in rows] == expected
+
+
+def test_outage_json_matches_pydantic(outage_repository: OutageRepository) -> None:
+    berlin = ZoneInfo("Europe/Berlin")
+    plus = timezone(timedelta(hours=5, minutes=30))
+    minus = timezone(timedelta(hours=-3, minutes=-30))
+    outages = [
+        (datetime(2024, 3, 31, 1, 59, tzinfo=berlin), datetime(2024, 3, 31, 3, 1, tzinfo=berlin), "ipv4"),
+        (datetime(2024, 10, 27, 2, 30, tzinfo=berlin), None, "ipv6"),
+        (datetime(2024, 5, 1, 10, tzinfo=timezone.utc), datetime(2024, 5, 1, 11, tzinfo=timezone.utc), "ipv4"),
+        (datetime(2024, 5, 2, 10, tzinfo=plus), datetime(2024, 5, 2, 10, 0, 1, tzinfo=plus), None),
+        (datetime(2024, 5, 3, 10, tzinfo=minus), None, "ipv6"),
+    ]
+    outage_repository.replace_outages(
+        {
+            "start_time": start,
+            "end_time": end,
+            "duration_seconds": int((end - start).total_seconds()) if end else None,
+            "status": "closed" if end else "open",
+            "start_log_entry_id": index,
+            "protocol": protocol,
+        }
+        for index, (start, end, protocol) in enumerate(outages)
+    )
+
+    records = outage_repository.list_outages()
+    rows = outage_repository.list_outages_json()
+
+    assert len(rows) == len(outages)
+    assert [row[0] for row in rows] == [record.id for record in records]
+    expected = [
+        OutageWindow(
+            start=record.start_time,
+            end=record.end_time,
+            duration_seconds=record.duration_seconds,
+            status=record.status,
+            protocol=record.protocol,
+        ).model_dump_json()
+        for record in records
+    ]
+    assert [row[2] for row in rows] == expected
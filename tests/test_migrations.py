@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from backend import migrations
+from backend.database import (
+    AvailabilityRepository,
+    DatabaseContext,
+    DeviceLogRepository,
+    OutageRepository,
+    StatusRepository,
+)
+from backend.migrations import MIGRATIONS, apply_migrations
+from backend.models import DEFAULT_ROUTER_ID
+
+_CREATED = "2024-03-02T12:00:00"
+_BERLIN = ZoneInfo("Europe/Berlin")
+
+
+def test_fresh_database_applies_every_migration_once() -> None:
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+
+    assert apply_migrations(conn) == [migration.version for migration in MIGRATIONS]
+    assert apply_migrations(conn) == []
+    recorded = conn.execute("SELECT version, name FROM schema_migrations ORDER BY version").fetchall()
+    assert recorded == [(migration.version, migration.name) for migration in MIGRATIONS]
+
+
+def _legacy_database(path: Path, monkeypatch: pytest.MonkeyPatch, through_version: int) -> sqlite3.Connection:
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS[:through_version])
+    conn = sqlite3.connect(path, isolation_level=None)
+    apply_migrations(conn)
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS)
+    return conn
+
+
+def test_upgrade_from_iso_text_schema(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, set_timezone: Callable[[str], None]
+) -> None:
+    # Naive legacy times are router time, whatever the server's time zone is.
+    set_timezone("America/New_York")
+    path = tmp_path / "legacy.db"
+    conn = _legacy_database(path, monkeypatch, through_version=5)
+    conn.executemany(
+        "INSERT INTO status_events (timestamp, status, details) VALUES (?, ?, ?)",
+        [
+            ("2024-03-01T10:00:00+00:00", "online", None),
+            ("2024-03-01T11:00:00+00:00", "offline", '{"reason": "ü"}'),
+            ("kaputt", "error", None),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO device_log_entries (log_timestamp, message, raw, ingested_at) VALUES (?, ?, ?, ?)",
+        [
+            (
+                "2024-03-01T11:59:00",
+                "Internetverbindung wurde getrennt.",
+                "01.03.24 11:59:00 Internetverbindung wurde getrennt.",
+                "2024-03-01 11:00:00",
+            ),
+            ("2024-03-01T12:04:00", "Internetverbindung wurde erfolgreich hergestellt.", None, "2024-03-01 11:05:00"),
+            ("gestern", "unlesbar", None, "2024-03-01 11:05:00"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO outages (start_time, end_time, duration_seconds, status, source, start_log_entry_id,"
+        " end_log_entry_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("2024-03-01T11:59:00", "2024-03-01T12:04:00", 300, "closed", "calculated", 1, 2, _CREATED, _CREATED),
+            (
+                "2024-03-02T09:00:00+00:00",
+                "2024-03-02T10:00:00+00:00",
+                3600,
+                "manual",
+                "manual",
+                None,
+                None,
+                _CREATED,
+                _CREATED,
+            ),
+        ],
+    )
+    conn.execute(
+        "INSERT INTO outage_calculator_state VALUES (1, 2, '2024-03-01T12:04:00', '{}', '{}', 'alt', '2024-03-01')"
+    )
+    conn.close()
+
+    context = DatabaseContext(path)
+    with context.connect() as upgraded:
+        assert apply_migrations(upgraded) == [migration.version for migration in MIGRATIONS[5:]]
+
+    status = StatusRepository(context)
+    assert [(event.timestamp, event.status, event.details) for event in status.iterate_events()] == [
+        (datetime(2024, 3, 1, 10, tzinfo=timezone.utc), "online", None),
+        (datetime(2024, 3, 1, 11, tzinfo=timezone.utc), "offline", '{"reason": "ü"}'),
+    ]
+
+    device_log = DeviceLogRepository(context)
+    entries = device_log.list_entries()
+    assert [(entry.id, entry.timestamp, entry.message) for entry in entries] == [
+        (1, datetime(2024, 3, 1, 11, 59, tzinfo=_BERLIN), "Internetverbindung wurde getrennt."),
+        (2, datetime(2024, 3, 1, 12, 4, tzinfo=_BERLIN), "Internetverbindung wurde erfolgreich hergestellt."),
+    ]
+    # A line stored without raw text keeps reading back as its message.
+    assert entries[0].raw == "01.03.24 11:59:00 Internetverbindung wurde getrennt."
+    assert (entries[1].raw or entries[1].message) == entries[1].message
+    # Ids continue after the old rows, including the unconverted one.
+    assert device_log.ingest_new_entries([{"timestamp": "2024-03-03T00:00:00", "message": "neu"}]) == [4]
+
+    outages = OutageRepository(context)
+    assert [(o.start_time, o.end_time, o.status, o.protocol) for o in outages.list_outages()] == [
+        (datetime(2024, 3, 1, 11, 59, tzinfo=_BERLIN), datetime(2024, 3, 1, 12, 4, tzinfo=_BERLIN), "closed", None),
+        (datetime(2024, 3, 2, 9, tzinfo=timezone.utc), datetime(2024, 3, 2, 10, tzinfo=timezone.utc), "manual", None),
+    ]
+    # The checkpoint was dropped so the next sync recalculates protocols.
+    assert outages.load_checkpoint() is None
+
+    buckets = AvailabilityRepository(context).list_buckets("day", datetime(2024, 3, 1), datetime(2024, 3, 3))
+    assert [(bucket.bucket_start, bucket.downtime_seconds, bucket.outage_count) for bucket in buckets] == [
+        (datetime(2024, 3, 1, tzinfo=_BERLIN), 300, 1),
+        (datetime(2024, 3, 2, tzinfo=_BERLIN), 3600, 1),
+    ]
+
+    with context.connect() as upgraded:
+        for table in ("status_events", "device_log_entries", "outages"):
+            routers = {row[0] for row in upgraded.execute(f"SELECT router_id FROM {table}")}
+            assert routers == {DEFAULT_ROUTER_ID}
+        # Rows with unreadable times are kept as they were.
+        unconverted = upgraded.execute(
+            "SELECT table_name, row_id, row FROM unconverted_rows ORDER BY table_name"
+        ).fetchall()
+    assert [(table, row_id, json.loads(row)) for table, row_id, row in unconverted] == [
+        (
+            "device_log_entries",
+            3,
+            {
+                "id": 3,
+                "log_timestamp": "gestern",
+                "message": "unlesbar",
+                "raw": None,
+                "source": "tr064",
+                "ingested_at": "2024-03-01 11:05:00",
+            },
+        ),
+        ("status_events", 3, {"id": 3, "timestamp": "kaputt", "status": "error", "details": None}),
+    ]
+    context.close()
+
+
+def test_failed_migration_is_rolled_back(monkeypatch: pytest.MonkeyPatch) -> None:
+    def broken(conn: sqlite3.Connection) -> None:
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("broken migration")
+
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    monkeypatch.setattr(
+        migrations, "MIGRATIONS", (*MIGRATIONS, migrations.Migration(MIGRATIONS[-1].version + 1, "broken", broken))
+    )
+
+    with pytest.raises(RuntimeError):
+        apply_migrations(conn)
+
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "half_done" not in tables
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    assert versions == [migration.version for migration in MIGRATIONS]
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from backend.database import DatabaseContext, DeviceLogRepository, OutageRepository
+from backend.device_log_sync import DeviceLogSync
+from backend.fritzbox_client import FritzboxClient
+from backend.models import DeviceLogEntryRecord
+from backend.outage_calculator import OutageCalculator
+from backend.outage_config import DEFAULT_OUTAGE_KEYWORDS, OutageKeywords
+
+_BERLIN = ZoneInfo("Europe/Berlin")
+_MESSAGES = [
+    "Internetverbindung wurde getrennt.",
+    "Internetverbindung wurde erfolgreich hergestellt.",
+    "Internetverbindung IPv6 wurde getrennt.",
+    "Internetverbindung IPv6 wurde erfolgreich hergestellt.",
+    "Zwangstrennung durch den Anbieter",
+    "WLAN-Gerät angemeldet",
+]
+
+
+def _random_log(count: int, seed: int) -> List[DeviceLogEntryRecord]:
+    rng = random.Random(seed)
+    moment = datetime(2024, 1, 1)
+    entries = []
+    for index in range(count):
+        moment += timedelta(seconds=rng.randint(0, 900))
+        entries.append(
+            DeviceLogEntryRecord(
+                id=index + 1, timestamp=moment, message=rng.choice(_MESSAGES), raw=None, source="tr064"
+            )
+        )
+    return entries
+
+
+def _by_start(outages: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+    return {outage["start_log_entry_id"]: outage for outage in outages}
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_resuming_from_any_checkpoint_matches_full_calculation(seed: int) -> None:
+    calculator = OutageCalculator()
+    entries = _random_log(120, seed)
+    full, full_checkpoint = calculator.calculate_incremental(entries, None)
+
+    for split in range(len(entries) + 1):
+        first, checkpoint = calculator.calculate_incremental(entries[:split], None)
+        second, resumed_checkpoint = calculator.calculate_incremental(entries[split:], checkpoint)
+
+        # Outages still open at the split are reported again by the second part.
+        combined = _by_start(first)
+        combined.update(_by_start(second))
+        assert combined == _by_start(full), split
+        assert resumed_checkpoint == full_checkpoint, split
+
+
+def test_lazy_stream_matches_list() -> None:
+    calculator = OutageCalculator()
+    entries = _random_log(2500, seed=1)
+
+    assert calculator.calculate(iter(entries)) == calculator.calculate(entries)
+
+
+def test_checkpoint_is_tied_to_the_keywords() -> None:
+    other = OutageKeywords(*(fields + ("zusätzlich",) for fields in vars(DEFAULT_OUTAGE_KEYWORDS).values()))
+
+    assert OutageCalculator().config_fingerprint == OutageCalculator(DEFAULT_OUTAGE_KEYWORDS).config_fingerprint
+    assert OutageCalculator(other).config_fingerprint != OutageCalculator().config_fingerprint
+
+
+class _FakeClient(FritzboxClient):
+    """Serves ``lines`` newest first like the router; parsing is the real one."""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def fetch_device_log_blob(self) -> str:
+        return "\n".join(reversed(self.lines[-400:]))
+
+
+def _stored_outages(repository: OutageRepository) -> List[tuple]:
+    return [
+        (outage.start_time, outage.end_time, outage.status, outage.protocol)
+        for outage in repository.list_outages()
+    ]
+
+
+def test_incremental_syncs_match_recalculation(
+    db_context: DatabaseContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _FakeClient()
+    outage_repository = OutageRepository(db_context)
+    sync = DeviceLogSync(client, DeviceLogRepository(db_context), outage_repository, OutageCalculator())
+    recalculations = []
+    recalculate_all = sync.recalculate_all
+
+    def counting_recalculate_all() -> None:
+        recalculations.append(1)
+        recalculate_all()
+
+    monkeypatch.setattr(sync, "recalculate_all", counting_recalculate_all)
+    rng = random.Random(3)
+    moment = datetime(2024, 1, 1)
+    for _ in range(200):
+        for _ in range(rng.randint(0, 4)):
+            moment += timedelta(seconds=rng.randint(1, 900))
+            client.lines.append(f"{moment:%d.%m.%y %H:%M:%S} {rng.choice(_MESSAGES)}")
+        sync.run_once()
+
+    incremental = _stored_outages(outage_repository)
+    checkpoint = outage_repository.load_checkpoint()
+    # Only the first sync, without a stored checkpoint, recalculated everything.
+    assert recalculations == [1]
+    recalculate_all()
+
+    assert incremental
+    assert incremental == _stored_outages(outage_repository)
+    assert checkpoint == outage_repository.load_checkpoint()
+
+
+def test_entries_older_than_the_checkpoint_trigger_recalculation(db_context: DatabaseContext) -> None:
+    client = _FakeClient()
+    device_log_repository = DeviceLogRepository(db_context)
+    outage_repository = OutageRepository(db_context)
+    sync = DeviceLogSync(client, device_log_repository, outage_repository, OutageCalculator())
+    client.lines = [
+        "01.02.24 10:00:00 Internetverbindung wurde getrennt.",
+        "01.02.24 10:05:00 Internetverbindung wurde erfolgreich hergestellt.",
+    ]
+    sync.run_once()
+
+    # An imported archive adds an outage before the checkpoint.
+    device_log_repository.ingest_entries(
+        [
+            {"timestamp": "2024-01-15T08:00:00", "message": "Internetverbindung wurde getrennt."},
+            {"timestamp": "2024-01-15T08:01:00", "message": "Internetverbindung wurde erfolgreich hergestellt."},
+        ]
+    )
+    client.lines.append("01.02.24 11:00:00 WLAN-Gerät angemeldet")
+    sync.run_once()
+
+    assert _stored_outages(outage_repository) == [
+        (datetime(2024, 1, 15, 8, 0, tzinfo=_BERLIN), datetime(2024, 1, 15, 8, 1, tzinfo=_BERLIN), "closed", "ipv4"),
+        (datetime(2024, 2, 1, 10, 0, tzinfo=_BERLIN), datetime(2024, 2, 1, 10, 5, tzinfo=_BERLIN), "closed", "ipv4"),
+    ]
+
+
+def _raise_locked(*args: Any, **kwargs: Any) -> None:
+    raise sqlite3.OperationalError("database is locked")
+
+
+def test_failed_outage_update_is_repeated_on_the_next_sync(
+    db_context: DatabaseContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _FakeClient()
+    outage_repository = OutageRepository(db_context)
+    sync = DeviceLogSync(client, DeviceLogRepository(db_context), outage_repository, OutageCalculator())
+    client.lines = ["01.02.24 09:00:00 Internetverbindung wurde erfolgreich hergestellt."]
+    sync.run_once()
+
+    client.lines.append("01.02.24 10:00:00 Internetverbindung wurde getrennt.")
+    monkeypatch.setattr(outage_repository, "upsert_outages", _raise_locked)
+    with pytest.raises(sqlite3.OperationalError):
+        sync.run_once()
+    monkeypatch.undo()
+
+    # The disconnect line is stored already; the same log text brings no new rows.
+    sync.run_once()
+
+    assert sync.outage_open
+    assert _stored_outages(outage_repository) == [(datetime(2024, 2, 1, 10, 0, tzinfo=_BERLIN), None, "open", "ipv4")]
+
+
+def test_failed_outage_update_keeps_boundary_and_fingerprint(
+    db_context: DatabaseContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _FakeClient()
+    outage_repository = OutageRepository(db_context)
+    sync = DeviceLogSync(client, DeviceLogRepository(db_context), outage_repository, OutageCalculator())
+    client.lines = ["01.02.24 09:00:00 Internetverbindung wurde erfolgreich hergestellt."]
+    sync.run_once()
+
+    boundaries = []
+    parse_device_log = client.parse_device_log
+
+    def recording_parse(log_blob: str, boundary: Any = None) -> List[Dict[str, Any]]:
+        boundaries.append(boundary)
+        return parse_device_log(log_blob, boundary=boundary)
+
+    monkeypatch.setattr(client, "parse_device_log", recording_parse)
+    client.lines.append("01.02.24 10:00:00 Internetverbindung wurde getrennt.")
+    with monkeypatch.context() as failing:
+        failing.setattr(outage_repository, "upsert_outages", _raise_locked)
+        with pytest.raises(sqlite3.OperationalError):
+            sync.run_once()
+
+    # The same log text is not skipped and is parsed from the same boundary again.
+    sync.run_once()
+
+    assert sync.syncs_skipped == 0
+    assert boundaries[0] == boundaries[1]
+    assert boundaries[1].timestamp == datetime(2024, 2, 1, 9, 0)
+    assert sync.outage_open
+    assert _stored_outages(outage_repository) == [(datetime(2024, 2, 1, 10, 0, tzinfo=_BERLIN), None, "open", "ipv4")]
+
+    sync.run_once()
+    assert sync.syncs_skipped == 1
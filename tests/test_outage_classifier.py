@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from backend.models import DeviceLogEntryRecord
+from backend.outage_classifier import OutageClassifier, categorize_log_entry, compile_classifier
+from backend.outage_config import DEFAULT_OUTAGE_KEYWORDS, OutageKeywords
+
+
+def _entry(entry_id: int, message: str) -> DeviceLogEntryRecord:
+    return DeviceLogEntryRecord(id=entry_id, timestamp=datetime(2024, 1, 1), message=message, raw=None, source="tr064")
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("Internetverbindung wurde getrennt.", ("ipv4", "disconnect")),
+        ("Internetverbindung wurde erfolgreich hergestellt. IP-Adresse: 1.2.3.4", ("ipv4", "connect")),
+        # The IPv6 messages contain no IPv4 keyword, but are checked first anyway.
+        ("Internetverbindung IPv6 wurde getrennt.", ("ipv6", "disconnect")),
+        ("Internetverbindung IPv6 wurde erfolgreich hergestellt.", ("ipv6", "connect")),
+        ("IPv6-Präfix ist nicht mehr gültig.", ("ipv6", "disconnect")),
+        ("IPv6-Präfix wurde erfolgreich bezogen.", ("ipv6", "connect")),
+        ("INTERNETVERBINDUNG WURDE GETRENNT", ("ipv4", "disconnect")),
+        ("Zwangstrennung durch den Anbieter", ("both", "planned_hint")),
+        # Planned hints win over the disconnect keyword in the same line.
+        ("Internetverbindung wurde getrennt (Zwangstrennung).", ("both", "planned_hint")),
+        ("WLAN-Gerät angemeldet", ("unknown", "ignore")),
+        ("", ("unknown", "ignore")),
+        (None, ("unknown", "ignore")),
+    ],
+)
+def test_default_keywords(message: str, expected: tuple) -> None:
+    assert compile_classifier(DEFAULT_OUTAGE_KEYWORDS).categorize(message) == expected
+
+
+def test_priority_follows_category_order() -> None:
+    classifier = OutageClassifier(
+        OutageKeywords(
+            planned_keywords=("wartung",),
+            ipv4_disconnect_keywords=("getrennt",),
+            ipv4_connect_keywords=("verbunden",),
+            ipv6_disconnect_keywords=("v6 getrennt",),
+            ipv6_connect_keywords=("v6 verbunden",),
+        )
+    )
+
+    assert classifier.categorize("v6 getrennt") == ("ipv6", "disconnect")
+    assert classifier.categorize("v6 verbunden, getrennt") == ("ipv6", "connect")
+    assert classifier.categorize("getrennt, dann verbunden") == ("ipv4", "disconnect")
+    assert classifier.categorize("verbunden nach wartung") == ("both", "planned_hint")
+
+
+def test_keywords_sharing_prefixes() -> None:
+    keywords = tuple(f"fehler {index}" for index in range(500)) + ("fehler",)
+    classifier = OutageClassifier(
+        OutageKeywords(
+            planned_keywords=(),
+            ipv4_disconnect_keywords=keywords,
+            ipv4_connect_keywords=("fehlerfrei verbunden",),
+            ipv6_disconnect_keywords=(),
+            ipv6_connect_keywords=(),
+        )
+    )
+
+    assert classifier.categorize("Fehler 499 aufgetreten") == ("ipv4", "disconnect")
+    assert classifier.categorize("Fehler") == ("ipv4", "disconnect")
+    # "fehler" is a prefix of the connect keyword, so disconnect wins.
+    assert classifier.categorize("fehlerfrei verbunden") == ("ipv4", "disconnect")
+    assert classifier.categorize("Fehle") == ("unknown", "ignore")
+    assert classifier.categorize("a.b*c (fehler 12)") == ("ipv4", "disconnect")
+
+
+def test_without_keywords_everything_is_unknown() -> None:
+    classifier = OutageClassifier(OutageKeywords((), (), (), (), ()))
+
+    assert classifier.categorize("Internetverbindung wurde getrennt.") == ("unknown", "ignore")
+    assert classifier.categorize_many([_entry(1, "Internetverbindung wurde getrennt.")]) == [("unknown", "ignore")]
+
+
+def test_categorize_many_matches_categorize() -> None:
+    classifier = compile_classifier(DEFAULT_OUTAGE_KEYWORDS)
+    messages = [
+        "Internetverbindung wurde getrennt.",
+        "WLAN-Gerät angemeldet",
+        "Internetverbindung IPv6 wurde erfolgreich hergestellt.",
+        "Zwangstrennung",
+        "",
+        "Trennung\nInternetverbindung wurde erfolgreich hergestellt.",
+        "WLAN-Gerät abgemeldet\n",
+        "internetverbindung ipv6 wurde getrennt.",
+    ]
+    entries = [_entry(index, message) for index, message in enumerate(messages)]
+
+    assert classifier.categorize_many(iter(entries)) == [classifier.categorize(message) for message in messages]
+    assert classifier.categorize_many([]) == []
+    assert classifier.categorize_many([_entry(1, None)]) == [("unknown", "ignore")]  # type: ignore[arg-type]
+
+
+def test_categorize_log_entry_uses_the_compiled_classifier() -> None:
+    entry = _entry(1, "Internetverbindung wurde getrennt.")
+
+    assert categorize_log_entry(entry, DEFAULT_OUTAGE_KEYWORDS) == ("ipv4", "disconnect")
+
+
+def test_compile_classifier_is_cached() -> None:
+    assert compile_classifier(DEFAULT_OUTAGE_KEYWORDS) is compile_classifier(DEFAULT_OUTAGE_KEYWORDS)
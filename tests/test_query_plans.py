@@ -0,0 +1,189 @@
+"""Hot queries are answered from an index, never by a full table scan.
+
+Each case runs a repository method with the statement trace enabled and
+checks ``EXPLAIN QUERY PLAN`` of every SELECT it issued.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List
+
+import pytest
+
+from backend.database import (
+    AvailabilityRepository,
+    DatabaseContext,
+    DeviceLogRepository,
+    OutageRepository,
+    RetentionRepository,
+    StatusRepository,
+)
+from backend.models import OutageCheckpoint
+
+_DAY = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_CHECKPOINT = OutageCheckpoint(
+    last_entry_id=4,
+    last_timestamp=_DAY,
+    open_state={
+        "ipv4": {"start": None, "start_entry_id": None, "planned": False},
+        "ipv6": {"start": None, "start_entry_id": None, "planned": False},
+    },
+    pending_planned={"ipv4": False, "ipv6": False},
+    config_fingerprint="fingerprint",
+)
+_OUTAGE = {
+    "start_time": _DAY,
+    "end_time": _DAY + timedelta(hours=1),
+    "duration_seconds": 3600,
+    "status": "closed",
+    "start_log_entry_id": 3,
+    "end_log_entry_id": 4,
+    "protocol": "ipv4",
+}
+
+# (case, method, expected index, ordered by time and id)
+_CASES: List[Any] = [
+    ("status_latest_event", lambda r: r["status"].latest_event(), "idx_status_events_timestamp", True),
+    (
+        "status_iterate_events",
+        lambda r: list(r["status"].iterate_events(_DAY, _DAY + timedelta(days=1))),
+        "idx_status_events_timestamp",
+        True,
+    ),
+    (
+        "device_log_newest_page",
+        lambda r: r["device_log"].list_entries(limit=100, ascending=False),
+        "idx_device_log_entries_timestamp",
+        True,
+    ),
+    (
+        "device_log_range",
+        lambda r: r["device_log"].list_entries(limit=100, start=_DAY, end=_DAY + timedelta(days=1)),
+        "idx_device_log_entries_timestamp",
+        True,
+    ),
+    (
+        "device_log_before_cursor",
+        lambda r: r["device_log"].list_entries(limit=100, before=(1_700_000_000, 5)),
+        "idx_device_log_entries_timestamp",
+        True,
+    ),
+    (
+        "device_log_json_after_cursor",
+        lambda r: r["device_log"].list_entries_json(limit=100, ascending=False, after=(1_700_000_000, 5)),
+        "idx_device_log_entries_timestamp",
+        True,
+    ),
+    (
+        "device_log_latest_boundary",
+        lambda r: r["device_log"].latest_boundary(),
+        "idx_device_log_entries_timestamp",
+        True,
+    ),
+    (
+        "device_log_entries_after",
+        lambda r: r["device_log"].list_entries_after(5),
+        "idx_device_log_entries_router_id",
+        False,
+    ),
+    (
+        "device_log_latest_entry_id",
+        lambda r: r["device_log"].latest_entry_id(),
+        "idx_device_log_entries_router_id",
+        False,
+    ),
+    (
+        "device_log_iter_entries",
+        lambda r: list(r["device_log"].iter_entries()),
+        "idx_device_log_entries_timestamp",
+        True,
+    ),
+    (
+        "outages_newest_page",
+        lambda r: r["outages"].list_outages(limit=100, ascending=False),
+        "idx_outages_start_time",
+        True,
+    ),
+    (
+        "outages_json_range",
+        lambda r: r["outages"].list_outages_json(limit=100, start=_DAY),
+        "idx_outages_start_time",
+        True,
+    ),
+    (
+        "outages_overlapping",
+        lambda r: r["outages"].list_overlapping(_DAY, _DAY + timedelta(days=1)),
+        "idx_outages_open",
+        False,
+    ),
+    (
+        "outages_checkpoint",
+        lambda r: r["outages"].load_checkpoint(),
+        "sqlite_autoindex_outage_calculator_state_1",
+        False,
+    ),
+    (
+        "outages_upsert",
+        lambda r: r["outages"].upsert_outages([_OUTAGE], _CHECKPOINT),
+        "idx_outages_source_start_entry",
+        False,
+    ),
+    (
+        "availability_buckets",
+        lambda r: r["availability"].list_buckets("day", _DAY, _DAY + timedelta(days=7)),
+        "idx_outages_open",
+        False,
+    ),
+    (
+        "retention_expired_log_lines",
+        lambda r: r["retention"].expired_rows("device_log_entries", "default", _DAY, 100),
+        "idx_device_log_entries_timestamp",
+        True,
+    ),
+    (
+        "retention_expired_status_events",
+        lambda r: r["retention"].expired_rows("status_events", "default", _DAY, 100),
+        "idx_status_events_timestamp",
+        True,
+    ),
+]
+
+
+def _query_plans(context: DatabaseContext, call: Callable[[], Any]) -> List[str]:
+    statements: List[str] = []
+    with context.connect() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            call()
+        finally:
+            conn.set_trace_callback(None)
+        details = []
+        for statement in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            details.extend(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}"))
+    assert details, "the method issued no SELECT"
+    return details
+
+
+@pytest.mark.parametrize("case, method, index, ordered", _CASES, ids=[case[0] for case in _CASES])
+def test_hot_query_uses_index(
+    db_context: DatabaseContext,
+    case: str,
+    method: Callable[[dict], Any],
+    index: str,
+    ordered: bool,
+) -> None:
+    repositories = {
+        "status": StatusRepository(db_context),
+        "device_log": DeviceLogRepository(db_context),
+        "outages": OutageRepository(db_context),
+        "availability": AvailabilityRepository(db_context),
+        "retention": RetentionRepository(db_context),
+    }
+    details = _query_plans(db_context, lambda: method(repositories))
+
+    assert not [detail for detail in details if detail.startswith("SCAN ")], details
+    assert any(index in detail for detail in details), details
+    if ordered:
+        assert not [detail for detail in details if "TEMP B-TREE" in detail], details
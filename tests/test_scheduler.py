@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, List
+
+from backend.scheduler import ScheduledJob, Scheduler
+
+
+def _run(scenario: Callable[[Scheduler], Awaitable[Any]], **options: Any) -> Any:
+    async def main() -> Any:
+        scheduler = Scheduler(**{"max_workers": 2, **options})
+        try:
+            return await scenario(scheduler)
+        finally:
+            await scheduler.stop()
+
+    return asyncio.run(main())
+
+
+def test_runs_on_a_fixed_grid() -> None:
+    async def scenario(scheduler: Scheduler) -> ScheduledJob:
+        job = scheduler.schedule("grid", 0.05, lambda: time.sleep(0.02))
+        await scheduler.start()
+        await asyncio.sleep(0.33)
+        return job
+
+    job = _run(scenario)
+
+    # Ticks at 0, 0.05, ..., 0.30; the run time does not shift the grid.
+    assert 6 <= job.runs <= 7
+    assert job.failures == job.skipped_busy == 0
+    assert job.last_duration_seconds is not None and job.last_duration_seconds >= 0.02
+
+
+def test_skips_ticks_while_the_previous_run_is_busy() -> None:
+    concurrent: List[int] = []
+    active = 0
+    lock = threading.Lock()
+
+    def work() -> None:
+        nonlocal active
+        with lock:
+            active += 1
+            concurrent.append(active)
+        time.sleep(0.2)
+        with lock:
+            active -= 1
+
+    async def scenario(scheduler: Scheduler) -> ScheduledJob:
+        job = scheduler.schedule("slow", 0.05, work)
+        await scheduler.start()
+        await asyncio.sleep(0.33)
+        return job
+
+    job = _run(scenario)
+
+    assert max(concurrent) == 1
+    assert job.runs <= 2
+    assert job.skipped_busy >= 3
+
+
+def test_backs_off_exponentially_after_failures() -> None:
+    errors: List[Exception] = []
+
+    def work() -> None:
+        raise RuntimeError("router unreachable")
+
+    async def scenario(scheduler: Scheduler) -> ScheduledJob:
+        job = scheduler.schedule("failing", 0.02, work, on_error=errors.append)
+        await scheduler.start()
+        await asyncio.sleep(0.5)
+        return job
+
+    job = _run(scenario)
+
+    # Failure n is followed by 2**(n-1) - 1 skipped ticks: 0, 1, 3, 7, ...
+    assert job.failures == job.runs == job.consecutive_failures == len(errors) >= 3
+    completed_backoff = sum(2 ** (failure - 1) - 1 for failure in range(1, job.failures))
+    assert completed_backoff <= job.skipped_backoff <= completed_backoff + 2 ** (job.failures - 1) - 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+
+def test_backoff_is_capped() -> None:
+    async def scenario(scheduler: Scheduler) -> ScheduledJob:
+        job = scheduler.schedule("capped", 0.02, lambda: 1 / 0)
+        await scheduler.start()
+        await asyncio.sleep(0.4)
+        return job
+
+    job = _run(scenario, max_backoff_seconds=0.04)
+
+    # At most two ticks per failure, so failures keep being retried.
+    assert job.failures >= 5
+    assert job.skipped_backoff <= job.failures
+
+
+def test_timed_out_run_counts_as_failure_and_keeps_the_job_busy() -> None:
+    errors: List[Exception] = []
+
+    async def scenario(scheduler: Scheduler) -> ScheduledJob:
+        job = scheduler.schedule("hung", 0.05, lambda: time.sleep(0.25), on_error=errors.append, timeout_seconds=0.05)
+        await scheduler.start()
+        await asyncio.sleep(0.2)
+        return job
+
+    job = _run(scenario)
+
+    assert job.timeouts == job.failures == 1
+    assert isinstance(errors[0], TimeoutError)
+    assert job.skipped_busy >= 1
+
+
+def test_shorter_interval_applies_immediately() -> None:
+    async def scenario(scheduler: Scheduler) -> ScheduledJob:
+        job = scheduler.schedule("adaptive", 60, lambda: None)
+        await scheduler.start()
+        await asyncio.sleep(0.05)
+        assert job.runs == 1
+
+        # Called from a worker thread, like the tracker does.
+        await asyncio.get_running_loop().run_in_executor(None, scheduler.set_interval, job, 0.05)
+        await asyncio.sleep(0.03)
+        assert job.runs == 2
+        await asyncio.sleep(0.2)
+        assert job.runs >= 5
+
+        scheduler.set_interval(job, 60)
+        await asyncio.sleep(0.1)
+        runs = job.runs
+        await asyncio.sleep(0.2)
+        assert job.runs == runs
+        return job
+
+    job = _run(scenario)
+
+    assert job.interval_seconds == 60
+
+
+def test_set_interval_before_start() -> None:
+    async def scenario(scheduler: Scheduler) -> ScheduledJob:
+        job = scheduler.schedule("early", 60, lambda: None)
+        scheduler.set_interval(job, 0.05)
+        await scheduler.start()
+        await asyncio.sleep(0.22)
+        return job
+
+    job = _run(scenario)
+
+    assert 4 <= job.runs <= 6
+
+
+def test_cancel_waits_for_the_running_run() -> None:
+    finished = threading.Event()
+
+    def work() -> None:
+        time.sleep(0.1)
+        finished.set()
+
+    async def scenario(scheduler: Scheduler) -> ScheduledJob:
+        job = scheduler.schedule("cancelled", 60, work)
+        await scheduler.start()
+        await asyncio.sleep(0.02)
+        await scheduler.cancel(job)
+        assert finished.is_set()
+        assert job not in scheduler.jobs
+        return job
+
+    job = _run(scenario)
+
+    assert job.runs == 1
+
+
+def test_error_handler_runs_while_a_hung_call_holds_every_worker() -> None:
+    release = threading.Event()
+    errors: List[Exception] = []
+
+    async def scenario(scheduler: Scheduler) -> List[Exception]:
+        scheduler.schedule("hung", 60, release.wait, on_error=errors.append, timeout_seconds=0.05)
+        await scheduler.start()
+        await asyncio.sleep(0.15)
+        handled = list(errors)
+        release.set()
+        return handled
+
+    handled = _run(scenario, max_workers=1)
+
+    assert len(handled) == 1 and isinstance(handled[0], TimeoutError)
+
+
+def test_scheduler_can_be_started_again() -> None:
+    async def scenario(scheduler: Scheduler) -> ScheduledJob:
+        scheduler.schedule("first", 60, lambda: None)
+        await scheduler.start()
+        await asyncio.sleep(0.02)
+        await scheduler.stop()
+        assert scheduler.jobs == []
+
+        job = scheduler.schedule("second", 60, lambda: None)
+        await scheduler.start()
+        await asyncio.sleep(0.02)
+        return job
+
+    job = _run(scenario)
+
+    assert job.runs == 1
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import calendar
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from backend.timestamps import epoch_ceil, epoch_floor, from_epoch, localize, to_epoch, to_wall_clock
+
+_BERLIN = ZoneInfo("Europe/Berlin")
+_ZONES = ["UTC", "Europe/Berlin", "America/St_Johns", "Australia/Lord_Howe"]
+
+
+@pytest.mark.parametrize(
+    ("moment", "offset_hours"),
+    [
+        (datetime(2024, 1, 1, 12, 0, 0), 1),
+        (datetime(2024, 7, 1, 12, 0, 0), 2),
+        # Does not exist in Europe/Berlin (spring forward) ...
+        (datetime(2024, 3, 31, 2, 30), 1),
+        # ... and exists twice there (fall back).
+        (datetime(2024, 10, 27, 2, 30), 2),
+    ],
+)
+@pytest.mark.parametrize("process_zone", _ZONES)
+def test_naive_times_are_read_in_the_router_zone(
+    set_timezone: Callable[[str], None], process_zone: str, moment: datetime, offset_hours: int
+) -> None:
+    set_timezone(process_zone)
+
+    epoch, offset = to_epoch(localize(moment, _BERLIN))
+
+    assert offset == offset_hours * 3600
+    assert epoch == calendar.timegm(moment.timetuple()) - offset
+    assert from_epoch(epoch, offset).replace(tzinfo=None) == moment
+
+
+@pytest.mark.parametrize(
+    "moment",
+    [
+        datetime(2024, 5, 1, 10, tzinfo=timezone.utc),
+        datetime(2024, 5, 1, 10, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+        datetime(2024, 5, 1, 10, tzinfo=timezone(timedelta(hours=-3, minutes=-30))),
+    ],
+)
+def test_aware_times_keep_instant_and_offset(moment: datetime) -> None:
+    epoch, offset = to_epoch(localize(moment, _BERLIN))
+    restored = from_epoch(epoch, offset)
+
+    assert epoch == int(moment.timestamp())
+    assert offset == int(moment.utcoffset().total_seconds())
+    assert restored == moment
+    assert restored.utcoffset() == moment.utcoffset()
+
+
+def test_localized_differences_are_real_durations_across_fall_back() -> None:
+    start = localize(datetime(2024, 10, 27, 1, 59), _BERLIN)
+    end = localize(datetime(2024, 10, 28, 1, 59), _BERLIN)
+
+    assert end - start == timedelta(hours=25)
+
+
+def test_naive_times_are_rejected() -> None:
+    with pytest.raises(ValueError):
+        to_epoch(datetime(2024, 1, 1))
+    with pytest.raises(ValueError):
+        epoch_floor(datetime(2024, 1, 1))
+
+
+def test_epoch_bounds_round_towards_the_range() -> None:
+    moment = datetime(2024, 1, 1, 0, 0, 0, 500_000, tzinfo=timezone.utc)
+    whole = calendar.timegm(moment.timetuple())
+
+    assert epoch_floor(moment) == whole
+    assert epoch_ceil(moment) == whole + 1
+    assert epoch_floor(moment.replace(microsecond=0)) == epoch_ceil(moment.replace(microsecond=0)) == whole
+    assert to_epoch(datetime(1969, 12, 31, 23, 59, 59, 500_000, tzinfo=timezone.utc))[0] == -1
+
+
+def test_to_wall_clock(set_timezone: Callable[[str], None]) -> None:
+    set_timezone("America/New_York")
+    naive = datetime(2024, 7, 1, 12, 0)
+
+    assert to_wall_clock(naive, _BERLIN) is naive
+    assert to_wall_clock(datetime(2024, 7, 1, 10, 0, tzinfo=timezone.utc), _BERLIN) == naive
+    assert to_wall_clock(datetime(2024, 1, 1, 11, 0, tzinfo=timezone.utc), _BERLIN) == datetime(2024, 1, 1, 12, 0)